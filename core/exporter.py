@@ -1,9 +1,19 @@
 from __future__ import annotations
 
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable, Sequence
+import io
+import os
+import re
 import shutil
+import sys
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional speedup only
+    ahocorasick = None
 
 from core.models import (
     AgentType,
@@ -18,10 +28,47 @@ from core.models import (
     SHAPE_VAR_TYPE,
 )
 
-_MESSAGE_TYPE_KEYS: dict[str, str] = {
-    "MessageSpatial3D": "spatial",
-    "MessageArray3D": "grid",
-    "MessageBucket": "bucket",
+# Compared against func.input_type/output_type in every render loop; interning
+# guarantees those checks short-circuit to pointer equality.
+_MSG_NONE = sys.intern("MessageNone")
+
+# msg_type -> (model constructor, short key used in message variable names)
+_MESSAGE_META: dict[str, tuple[str, str]] = {
+    "MessageSpatial3D": ("newMessageSpatial3D", "spatial"),
+    "MessageArray3D": ("newMessageArray3D", "grid"),
+    "MessageBucket": ("newMessageBucket", "bucket"),
+}
+
+_MESSAGE_TYPE_KEYS: dict[str, str] = {msg: meta[1] for msg, meta in _MESSAGE_META.items()}
+
+# Pre-parsed emission templates per message type; formatted once per message
+# instead of rebuilding each line as an f-string inside the render loop.
+_BUCKET_MSG_TPL = """{agent_name}_MAX_CONNECTIVITY = ? # the maximum expected connectivity of each node
+{agent_name}_N_NODES = ? # number of nodes in the bucket network
+{var_name} = model.newMessageBucket("{agent_name}_bucket_location_message")
+# Set the range and bounds.
+{var_name}.setBounds(0,{agent_name}_N_NODES)"""
+
+_SPATIAL_MSG_TPL = """{var_name} = model.{constructor}("{var_name}")
+{var_name}.setRadius(MAX_SEARCH_RADIUS_{agent_name})
+{var_name}.setMin(MIN_EXPECTED_BOUNDARY_POS, MIN_EXPECTED_BOUNDARY_POS, MIN_EXPECTED_BOUNDARY_POS)
+{var_name}.setMax(MAX_EXPECTED_BOUNDARY_POS, MAX_EXPECTED_BOUNDARY_POS, MAX_EXPECTED_BOUNDARY_POS)"""
+
+_ARRAY3D_MSG_TPL = """{var_name} = model.{constructor}("{var_name}")
+{agent_name}_AGENTS_PER_DIR = [?, ?, ?]
+{var_name}.setDimensions({agent_name}_AGENTS_PER_DIR[0], {agent_name}_AGENTS_PER_DIR[1], {agent_name}_AGENTS_PER_DIR[2])"""
+
+# Per-variable emission patterns for message definitions.
+_MSG_ARRAY_EMIT = '{mv}.{m}("{n}", {l})'
+_MSG_ARRAY_EMIT_UNSIZED = '{mv}.{m}("{n}", ?) # ? defines the length of the array variable'
+_MSG_SCALAR_EMIT = '{mv}.{m}("{n}")'
+
+_GENERIC_MSG_TPL = '''{var_name} = model.{constructor}("{var_name}")'''
+
+_MESSAGE_BLOCK_TEMPLATES: dict[str, str] = {
+    "MessageSpatial3D": _SPATIAL_MSG_TPL,
+    "MessageArray3D": _ARRAY3D_MSG_TPL,
+    "MessageBucket": _BUCKET_MSG_TPL,
 }
 
 _ENV_PROPERTY_METHODS: dict[str, str] = {
@@ -69,13 +116,29 @@ _AGENT_VARIABLE_METHODS: dict[str, str] = {
     "ArrayUInt": "newVariableArrayUInt",
 }
 
-_MESSAGE_CONSTRUCTORS: dict[str, str] = {
-    "MessageSpatial3D": "newMessageSpatial3D",
-    "MessageArray3D": "newMessageArray3D",
-    "MessageBucket": "newMessageBucket",
+_CPP_TYPE_MAP: dict[str, str] = {
+    "Float": "float",
+    "Int": "int",
+    "UInt8": "uint8_t",
+    "ArrayFloat": "float",
+    "ArrayUInt": "int",
 }
 
-_ARRAY_TYPES = {"ArrayFloat", "ArrayUInt", "ArrayInt"}
+# Fallback entries resolved once instead of on every `.get` miss.
+_DEFAULT_AGENT_METHOD = _AGENT_VARIABLE_METHODS[DEFAULT_VAR_TYPE]
+_DEFAULT_ENV_METHOD = _ENV_PROPERTY_METHODS[DEFAULT_VAR_TYPE]
+
+_ARRAY_TYPES = frozenset({"ArrayFloat", "ArrayUInt", "ArrayInt"})
+
+# Tokens of a bracketed, comma-separated literal ("[1, 2.5, ?]" -> "1", "2.5", "?").
+_ARRAY_TOKEN_RE = re.compile(r"[^,\[\]\s]+")
+
+# Boilerplate shared by every array-variable block in the generated C++ files.
+_ARRAY_COMMENT = "// Agent array variables"
+_ARRAY_SIZE_WARN = (
+    "const uint8_t {name}_ARRAY_SIZE = ?; // WARNING: this variable must be hard coded"
+    " to have the same value as the one defined in the main python function."
+)
 
 _LOGGING_METHODS = {
     "Mean": "logMean",
@@ -87,8 +150,147 @@ _LOGGING_METHODS = {
 
 _INTERPOLATED_MODE = "Interpolated"
 
+# The domain bounding box has 12 edges; each entry pairs the coord_boundary
+# indices of an edge's two vertices. Unrolled into the sketch block once at import.
+_BOX_EDGES = (
+    ((0, 2, 4), (0, 2, 5)),
+    ((0, 3, 4), (0, 3, 5)),
+    ((1, 2, 4), (1, 2, 5)),
+    ((1, 3, 4), (1, 3, 5)),
+    ((0, 2, 4), (0, 3, 4)),
+    ((0, 2, 5), (0, 3, 5)),
+    ((1, 2, 4), (1, 3, 4)),
+    ((1, 2, 5), (1, 3, 5)),
+    ((0, 2, 4), (1, 2, 4)),
+    ((0, 3, 4), (1, 3, 4)),
+    ((0, 2, 5), (1, 2, 5)),
+    ((0, 3, 5), (1, 3, 5)),
+)
+
+
+def _boundary_sketch_block() -> str:
+    lines = [
+        '    coord_boundary = list(env.getPropertyArrayFloat("BOUNDARY_COORDS"))',
+        "    pen = vis.newLineSketch(1, 1, 1, 0.8)",
+    ]
+    for index, edge in enumerate(_BOX_EDGES):
+        if index and index % 4 == 0:
+            lines.append("")
+        for i, j, k in edge:
+            lines.append(f"    pen.addVertex(coord_boundary[{i}], coord_boundary[{j}], coord_boundary[{k}])")
+    return "\n".join(lines)
+
+
+_BOUNDARY_SKETCH_BLOCK = _boundary_sketch_block()
+
+_VIS_JOIN_BLOCK = (
+    "if pyflamegpu.VISUALISATION and VISUALISATION and not ENSEMBLE:\n"
+    "    vis.join() # join the visualisation thread and stops the visualisation closing after the simulation finishes"
+)
+
 _TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
 
+_MAIN_TEMPLATE_PLACEHOLDERS = (
+    "[PLACEHOLDER_MODEL_NAME]",
+    "[PLACEHOLDER_DATE]",
+    "[PLACEHOLDER_ALL_GLOBALS]",
+    "[PLACEHODER_MODEL_GLOBALS]",
+    "[PLACEHOLDER_FUNCTION_FILES]",
+    "[PLACEHOLDER_MESSAGES]",
+    "[PLACEHOLDER_AGENTS]",
+    "[PLACEHOLDER_LAYERS]",
+    "[PLACEHOLDER_LOGGING]",
+    "[PLACEHOLDER_VISUALIZATION_1]",
+    "[PLACEHOLDER_VISUALIZATION_2]",
+    "[PLACEHOLDER_AGENT_LOGS]",
+    "[PLACEHOLDER_INIT_MACRO_PROPERTIES]",
+    "[PLACEHOLDER_MAX_SEARCH_RADIUS_AGENT_i_NAME]",
+)
+
+# One alternation over every known placeholder lets the template be rewritten in a
+# single scan instead of one full `str.replace` pass per key. The spatial-constants
+# block is part of the same replacement dict, so it rides along in that same pass.
+_PLACEHOLDER_RE = re.compile("|".join(re.escape(key) for key in _MAIN_TEMPLATE_PLACEHOLDERS))
+
+# When pyahocorasick is installed, stream the template through a DFA built once at
+# import time; otherwise the regex alternation above provides the same single pass.
+if ahocorasick is not None:
+    _PLACEHOLDER_AUTOMATON = ahocorasick.Automaton()
+    for _key in _MAIN_TEMPLATE_PLACEHOLDERS:
+        _PLACEHOLDER_AUTOMATON.add_word(_key, _key)
+    _PLACEHOLDER_AUTOMATON.make_automaton()
+else:
+    _PLACEHOLDER_AUTOMATON = None
+
+
+@lru_cache(maxsize=16)
+def _read_template(path: str) -> str:
+    """Load a template once per process; repeated exports reuse the cached text."""
+    return Path(path).read_text(encoding="utf-8")
+
+
+@lru_cache(maxsize=16)
+def _read_template_bytes(path: str) -> bytes:
+    """UTF-8 encoding of a template, cached so static chunks never re-encode."""
+    return _read_template(path).encode("utf-8")
+
+
+_PLACEHOLDER_RE_BYTES = re.compile(
+    b"|".join(re.escape(key.encode("ascii")) for key in _MAIN_TEMPLATE_PLACEHOLDERS)
+)
+
+
+def _iter_substituted_bytes(template: bytes, replacements: dict[str, str]) -> Iterable[bytes]:
+    """Bytes-domain variant of _iter_substituted.
+
+    The static template chunks are slices of the cached encoded template, so only
+    the (small) replacement values pay an encode per export.
+    """
+    last = 0
+    for match in _PLACEHOLDER_RE_BYTES.finditer(template):
+        yield template[last:match.start()]
+        yield replacements[match.group(0).decode("ascii")].encode("utf-8")
+        last = match.end()
+    yield template[last:]
+
+
+def _iter_substituted(template: str, replacements: dict[str, str]) -> Iterable[str]:
+    """Yield the template as chunks with placeholders replaced, in one linear scan.
+
+    Streaming chunks lets the caller write straight to disk without materialising
+    the fully substituted template as a second in-memory copy.
+    """
+    last = 0
+    if _PLACEHOLDER_AUTOMATON is not None:
+        for end_index, key in _PLACEHOLDER_AUTOMATON.iter(template):
+            start = end_index - len(key) + 1
+            if start < last:
+                continue
+            yield template[last:start]
+            yield replacements[key]
+            last = end_index + 1
+    else:
+        for match in _PLACEHOLDER_RE.finditer(template):
+            yield template[last:match.start()]
+            yield replacements[match.group(0)]
+            last = match.end()
+    yield template[last:]
+
+
+def _substitute_placeholders(template: str, replacements: dict[str, str]) -> str:
+    return "".join(_iter_substituted(template, replacements))
+
+
+@lru_cache(maxsize=8)
+def _compile_keyset(keys: frozenset[str]) -> re.Pattern[str]:
+    return re.compile("|".join(re.escape(key) for key in keys))
+
+
+def _apply_placeholders(template: str, mapping: dict[str, str]) -> str:
+    """Replace every placeholder in one scan, reusing the compiled pattern per key set."""
+    pattern = _compile_keyset(frozenset(mapping))
+    return pattern.sub(lambda match: mapping[match.group(0)], template)
+
 
 def export_model_files(
     model_name: str,
@@ -103,16 +305,39 @@ def export_model_files(
 ) -> Path:
     """Render the main template with the provided model data and write it to disk."""
     timestamp = created_at or datetime.now()
-    template = template_path.read_text(encoding="utf-8")
+
+    export_root = output_dir / model_name
+    export_root.mkdir(parents=True, exist_ok=True)
+
+    handy_functions_template = _TEMPLATES_DIR / "handy_device_functions_template.cpp"
+    if handy_functions_template.exists():
+        shutil.copy(handy_functions_template, export_root / handy_functions_template.name)
+
+    output_path = export_root / f"{model_name}.py"
+
+    if not (agents or layers or globals_ or connections) and visualization is None:
+        # Empty model: everything but the name and date is known ahead of time.
+        rendered = _apply_placeholders(
+            _empty_model_skeleton(str(template_path)),
+            {
+                "[PLACEHOLDER_MODEL_NAME]": model_name,
+                "[PLACEHOLDER_DATE]": f"{timestamp:%d/%m/%Y - %H:%M:%S}",
+            },
+        )
+        output_path.write_bytes(rendered.encode("utf-8"))
+        return output_path
+
+    template = _read_template(str(template_path))
+
+    agent_lookup = {agent.name: agent for agent in agents}
+    input_map = _build_input_map(connections or [])
 
     all_globals_block = _render_all_globals(globals_)
     env_globals_block = _render_model_globals(globals_)
     function_files_block = _render_function_files(agents)
-    messages_block, spatial_agents = _render_messages(agents)
-    agents_block = _render_agents(agents, connections or [])
+    messages_block, spatial_agents, agents_block, logging_block = _render_agent_blocks(agents, input_map)
     layers_block = _render_layers(layers)
-    logging_block = _render_logging(agents)
-    visualization_block_1, visualization_block_2 = _render_visualisation_blocks(agents, visualization)
+    visualization_block_1, visualization_block_2 = _render_visualisation_blocks(agent_lookup, visualization)
     agent_logs_block = _render_agent_logs(agents)
     macro_init_block = _render_macro_initialisation(globals_)
 
@@ -120,7 +345,7 @@ def export_model_files(
 
     replacements = {
         "[PLACEHOLDER_MODEL_NAME]": model_name,
-        "[PLACEHOLDER_DATE]": timestamp.strftime("%d/%m/%Y - %H:%M:%S"),
+        "[PLACEHOLDER_DATE]": f"{timestamp:%d/%m/%Y - %H:%M:%S}",
         "[PLACEHOLDER_ALL_GLOBALS]": all_globals_block,
         "[PLACEHODER_MODEL_GLOBALS]": env_globals_block,
         "[PLACEHOLDER_FUNCTION_FILES]": function_files_block,
@@ -132,36 +357,55 @@ def export_model_files(
         "[PLACEHOLDER_VISUALIZATION_2]": visualization_block_2,
         "[PLACEHOLDER_AGENT_LOGS]": agent_logs_block,
         "[PLACEHOLDER_INIT_MACRO_PROPERTIES]": macro_init_block,
+        "[PLACEHOLDER_MAX_SEARCH_RADIUS_AGENT_i_NAME]": constants_block,
     }
 
-    for placeholder, value in replacements.items():
-        template = template.replace(placeholder, value)
-
-    template = template.replace("[PLACEHOLDER_MAX_SEARCH_RADIUS_AGENT_i_NAME]", constants_block)
-
-    export_root = output_dir / model_name
-    export_root.mkdir(parents=True, exist_ok=True)
+    _generate_function_files(export_root, agents, agent_lookup, input_map)
+
+    if _PLACEHOLDER_AUTOMATON is not None:
+        with output_path.open("w", encoding="utf-8", newline="\n", buffering=1 << 16) as handle:
+            for chunk in _iter_substituted(template, replacements):
+                handle.write(chunk)
+    else:
+        template_bytes = _read_template_bytes(str(template_path))
+        with output_path.open("wb", buffering=1 << 16) as handle:
+            for chunk in _iter_substituted_bytes(template_bytes, replacements):
+                handle.write(chunk)
+    return output_path
 
-    _generate_function_files(export_root, agents, connections or [])
 
-    handy_functions_template = _TEMPLATES_DIR / "handy_device_functions_template.cpp"
-    if handy_functions_template.exists():
-        shutil.copy(handy_functions_template, export_root / handy_functions_template.name)
+@lru_cache(maxsize=4)
+def _empty_model_skeleton(template_path: str) -> str:
+    """Main template pre-rendered for a model with no agents, layers or globals.
 
-    output_path = export_root / f"{model_name}.py"
-    output_path.write_text(template, encoding="utf-8")
-    return output_path
+    All content placeholders collapse to their "# No ..." sentinels, so the result
+    only needs the model name and date filled in per export.
+    """
+    messages_block, spatial_agents, agents_block, logging_block = _render_agent_blocks((), {})
+    replacements = {
+        "[PLACEHOLDER_ALL_GLOBALS]": _render_all_globals(()),
+        "[PLACEHODER_MODEL_GLOBALS]": _render_model_globals(()),
+        "[PLACEHOLDER_FUNCTION_FILES]": _render_function_files(()),
+        "[PLACEHOLDER_MESSAGES]": messages_block,
+        "[PLACEHOLDER_AGENTS]": agents_block,
+        "[PLACEHOLDER_LAYERS]": _render_layers(()),
+        "[PLACEHOLDER_LOGGING]": logging_block,
+        "[PLACEHOLDER_VISUALIZATION_1]": _render_visualisation_blocks({}, None)[0],
+        "[PLACEHOLDER_VISUALIZATION_2]": _render_visualisation_blocks({}, None)[1],
+        "[PLACEHOLDER_AGENT_LOGS]": _render_agent_logs(()),
+        "[PLACEHOLDER_INIT_MACRO_PROPERTIES]": _render_macro_initialisation(()),
+        "[PLACEHOLDER_MAX_SEARCH_RADIUS_AGENT_i_NAME]": _render_spatial_constants(spatial_agents),
+    }
+    return _apply_placeholders(_read_template(template_path), replacements)
 
 
 def _render_all_globals(globals_: Sequence[GlobalVariable]) -> str:
     if not globals_:
         return "# No global variables defined"
 
-    lines: list[str] = []
-    for glob in globals_:
-        literal = _format_literal(glob.var_type, glob.value)
-        lines.append(f"{glob.name} = {literal}")
-    return "\n".join(lines)
+    return "\n".join(
+        f"{glob.name} = {_format_literal(glob.var_type, glob.value)}" for glob in globals_
+    )
 
 
 def _render_model_globals(globals_: Sequence[GlobalVariable]) -> str:
@@ -170,17 +414,17 @@ def _render_model_globals(globals_: Sequence[GlobalVariable]) -> str:
 
     lines: list[str] = []
     for glob in globals_:
-        if getattr(glob, "is_macro", False):
+        if glob.is_macro:
             method = _MACRO_PROPERTY_METHODS.get(glob.var_type, "newMacroPropertyFloat")
         else:
-            method = _ENV_PROPERTY_METHODS.get(glob.var_type, _ENV_PROPERTY_METHODS[DEFAULT_VAR_TYPE])
+            method = _ENV_PROPERTY_METHODS.get(glob.var_type, _DEFAULT_ENV_METHOD)
         literal = _format_literal(glob.var_type, glob.value)
         lines.append(f'env.{method}("{glob.name}", {literal})')
     return "\n".join(lines)
 
 
 def _render_macro_initialisation(globals_: Sequence[GlobalVariable]) -> str:
-    macro_vars = [glob for glob in globals_ if getattr(glob, "is_macro", False)]
+    macro_vars = [glob for glob in globals_ if glob.is_macro]
     if not macro_vars:
         return "# No macro properties initialisation required"
 
@@ -205,27 +449,27 @@ def _render_macro_initialisation(globals_: Sequence[GlobalVariable]) -> str:
     return "\n".join(lines)
 
 
+@lru_cache(maxsize=32)
 def _macro_accessor_for(var_type: str | None) -> str:
     key = var_type or DEFAULT_VAR_TYPE
     return _MACRO_PROPERTY_ACCESSORS.get(key, "getMacroPropertyFloat")
 
 
-def _generate_function_files(export_root: Path, agents: Sequence[AgentType], connections: Sequence[dict]) -> None:
-    agent_lookup = {agent.name: agent for agent in agents}
-    input_map = _build_input_map(connections)
-
+def _generate_function_files(
+    export_root: Path,
+    agents: Sequence[AgentType],
+    agent_lookup: dict[str, AgentType],
+    input_map: dict[tuple[str, str, str], str],
+) -> None:
+    export_root_str = os.fspath(export_root)
+    outputs: list[tuple[str, str]] = []
     for agent in agents:
-        for func in getattr(agent, "functions", []):
-            template_path = _select_function_template(getattr(func, "output_type", "MessageNone"))
+        for func in agent.functions:
+            template_path = _select_function_template(func.output_type)
             if not template_path or not template_path.exists():
                 continue
-            template_content = template_path.read_text(encoding="utf-8")
-            source_agent_name = _input_source_agent(
-                agent.name,
-                getattr(func, "name", ""),
-                getattr(func, "input_type", "MessageNone"),
-                input_map,
-            )
+            template_content = _read_template(str(template_path))
+            source_agent_name = input_map.get((agent.name, func.name, func.input_type))
             source_agent = agent_lookup.get(source_agent_name) if source_agent_name else None
             rendered = _render_function_template(
                 template_content,
@@ -233,88 +477,97 @@ def _generate_function_files(export_root: Path, agents: Sequence[AgentType], con
                 func,
                 source_agent,
             )
-            output_path = export_root / f"{func.name}.cpp"
-            output_path.write_text(rendered, encoding="utf-8")
+            outputs.append((os.path.join(export_root_str, f"{func.name}.cpp"), rendered))
+
+    # Render first, write second: keeps the I/O phase a tight loop of encoded writes.
+    for output_path, rendered in outputs:
+        with open(output_path, "w", encoding="utf-8") as handle:
+            handle.write(rendered)
 
 
 def _select_function_template(output_type: str) -> Path:
-    if output_type and output_type != "MessageNone":
+    if output_type and output_type != _MSG_NONE:
         return _TEMPLATES_DIR / "func_location_template.txt"
     return _TEMPLATES_DIR / "func_any_template.txt"
 
 
 def _render_function_template(template: str, agent: AgentType, func, source_agent: AgentType | None) -> str:
-    description = (getattr(func, "description", "") or "").strip()
+    description = (func.description or "").strip()
     if description:
         comment_lines = [f"// {line}" if line else "//" for line in description.splitlines()]
         template = "\n".join(comment_lines) + "\n" + template
 
+    var_descs = _prepare_var_descs(agent)
+    source_descs = _prepare_var_descs(source_agent)
+
     replacements: dict[str, str] = {
         "[PLACEHOLDER_FUNCTION_NAME]": func.name,
-        "[PLACEHOLDER_INPUT_MESSAGE]": getattr(func, "input_type", "MessageNone"),
-        "[PLACEHOLDER_OUTPUT_MESSAGE]": getattr(func, "output_type", "MessageNone"),
-        "[PLACEHOLDER_GET_AGENT_VARS]": _render_agent_variable_getters(agent),
-        "[PLACEHOLDER_SET_AGENT_VARS]": _render_agent_variable_setters(agent),
-        "[PLACE_HODER_MESSAGE_OUTPUT]": _render_message_output(agent, getattr(func, "output_type", "MessageNone")),
+        "[PLACEHOLDER_INPUT_MESSAGE]": func.input_type,
+        "[PLACEHOLDER_OUTPUT_MESSAGE]": func.output_type,
+        "[PLACEHOLDER_GET_AGENT_VARS]": _render_agent_variable_getters(var_descs),
+        "[PLACEHOLDER_SET_AGENT_VARS]": _render_agent_variable_setters(var_descs),
+        "[PLACE_HODER_MESSAGE_OUTPUT]": _render_message_output(var_descs, func.output_type),
         "[PLACEHOLDER_GET_MESSAGE_VARS]": _render_message_variable_getters(
-            source_agent,
-            getattr(func, "input_type", "MessageNone"),
+            source_descs,
+            func.input_type,
+            source_agent is not None,
         ),
     }
 
-    for placeholder, value in replacements.items():
-        template = template.replace(placeholder, value)
-    return template
+    return _apply_placeholders(template, replacements)
 
 
-def _render_agent_variable_getters(agent: AgentType) -> str:
-    lines: list[str] = []
-    for var in getattr(agent, "variables", []):
-        var_name = getattr(var, "name", "")
-        if not var_name:
+def _prepare_var_descs(agent: AgentType | None) -> list[tuple[str, str, str, str, bool]]:
+    """Resolve (name, var_type, cpp_type, element_type, is_array) once per agent.
+
+    The four variable renderers below share this pre-pass so the variable list is
+    walked and type-mapped a single time per function template.
+    """
+    if agent is None:
+        return []
+    descs: list[tuple[str, str, str, str, bool]] = []
+    for var in agent.variables:
+        if not var.name:
             continue
-        var_type = getattr(var, "var_type", DEFAULT_VAR_TYPE) or DEFAULT_VAR_TYPE
-        cpp_type = _cpp_type_for(var_type)
-        if var_type in _ARRAY_TYPES:
-            element_type = _array_element_type(var_type)
+        var_type = var.var_type or DEFAULT_VAR_TYPE
+        descs.append((
+            var.name,
+            var_type,
+            _cpp_type_for(var_type),
+            _array_element_type(var_type),
+            var_type in _ARRAY_TYPES,
+        ))
+    return descs
+
+
+def _render_agent_variable_getters(var_descs: Sequence[tuple[str, str, str, str, bool]]) -> str:
+    lines: list[str] = []
+    for var_name, _var_type, cpp_type, element_type, is_array in var_descs:
+        if is_array:
             lines.extend(_array_getter_block(var_name, element_type))
         else:
             lines.append(f"{cpp_type} agent_{var_name} = FLAMEGPU->getVariable<{cpp_type}>(\"{var_name}\");")
     return _indent_lines(lines)
 
 
-def _render_agent_variable_setters(agent: AgentType) -> str:
+def _render_agent_variable_setters(var_descs: Sequence[tuple[str, str, str, str, bool]]) -> str:
     lines: list[str] = []
-    for var in getattr(agent, "variables", []):
-        var_name = getattr(var, "name", "")
-        if not var_name:
-            continue
-        var_type = getattr(var, "var_type", DEFAULT_VAR_TYPE) or DEFAULT_VAR_TYPE
-        cpp_type = _cpp_type_for(var_type)
-        if var_type in _ARRAY_TYPES:
-            element_type = _array_element_type(var_type)
+    for var_name, _var_type, cpp_type, element_type, is_array in var_descs:
+        if is_array:
             lines.extend(_array_setter_block(var_name, element_type))
         else:
             lines.append(f'FLAMEGPU->setVariable<{cpp_type}>("{var_name}", agent_{var_name});')
     return _indent_lines(lines)
 
 
-def _render_message_output(agent: AgentType, output_type: str) -> str:
-    if output_type == "MessageNone":
+def _render_message_output(var_descs: Sequence[tuple[str, str, str, str, bool]], output_type: str) -> str:
+    if output_type == _MSG_NONE:
         return ""
     lines: list[str] = []
-    for var in getattr(agent, "variables", []):
-        var_name = getattr(var, "name", "")
-        if not var_name:
-            continue
-        var_type = getattr(var, "var_type", DEFAULT_VAR_TYPE) or DEFAULT_VAR_TYPE
-        cpp_type = _cpp_type_for(var_type)
-        if var_type in _ARRAY_TYPES:
-            element_type = _array_element_type(var_type)
-            lines.append("// Agent array variables")
-            lines.append(
-                f"const uint8_t {var_name}_ARRAY_SIZE = ?; // WARNING: this variable must be hard coded to have the same value as the one defined in the main python function."
-            )
+    for var_name, _var_type, cpp_type, element_type, is_array in var_descs:
+        if is_array:
+            lines.append(_ARRAY_COMMENT)
+            lines.append(_ARRAY_SIZE_WARN.format(name=var_name))
             lines.append("")
             lines.append(f"for (int i = 0; i < {var_name}_ARRAY_SIZE; i++) {{")
             lines.append(
@@ -331,25 +584,19 @@ def _render_message_output(agent: AgentType, output_type: str) -> str:
     return _indent_lines(lines)
 
 
-def _render_message_variable_getters(source_agent: AgentType | None, input_type: str) -> str:
-    if input_type == "MessageNone":
+def _render_message_variable_getters(
+    source_descs: Sequence[tuple[str, str, str, str, bool]],
+    input_type: str,
+    has_connection: bool,
+) -> str:
+    if input_type == _MSG_NONE:
         return ""
 
     lines: list[str] = ["//Define message variables (agent sending the input message)"]
-    message_vars = list(getattr(source_agent, "variables", [])) if source_agent else []
-    has_connection = source_agent is not None
 
-    for var in message_vars:
-        var_name = getattr(var, "name", "")
-        if not var_name:
-            continue
-        var_type = getattr(var, "var_type", DEFAULT_VAR_TYPE) or DEFAULT_VAR_TYPE
-        cpp_type = _cpp_type_for(var_type)
-        if var_type in _ARRAY_TYPES:
-            element_type = _array_element_type(var_type)
-            lines.append(
-                f"const uint8_t message_{var_name}_ARRAY_SIZE = ?; // WARNING: this variable must be hard coded to have the same value as the one defined in the main python function."
-            )
+    for var_name, _var_type, cpp_type, element_type, is_array in source_descs:
+        if is_array:
+            lines.append(_ARRAY_SIZE_WARN.format(name=f"message_{var_name}"))
             lines.append(f"{element_type} message_{var_name}[message_{var_name}_ARRAY_SIZE] = {{}};")
         else:
             lines.append(f"{cpp_type} message_{var_name} = {_default_cpp_value(cpp_type)};")
@@ -364,14 +611,8 @@ def _render_message_variable_getters(source_agent: AgentType | None, input_type:
     lines.append(_message_iteration_header(input_type))
 
     loop_body: list[str] = []
-    for var in message_vars:
-        var_name = getattr(var, "name", "")
-        if not var_name:
-            continue
-        var_type = getattr(var, "var_type", DEFAULT_VAR_TYPE) or DEFAULT_VAR_TYPE
-        cpp_type = _cpp_type_for(var_type)
-        if var_type in _ARRAY_TYPES:
-            element_type = _array_element_type(var_type)
+    for var_name, _var_type, cpp_type, element_type, is_array in source_descs:
+        if is_array:
             loop_body.append(
                 f"  for (int i = 0; i < message_{var_name}_ARRAY_SIZE; i++) {{"
             )
@@ -397,8 +638,8 @@ def _render_message_variable_getters(source_agent: AgentType | None, input_type:
 
 def _array_getter_block(name: str, element_type: str) -> list[str]:
     return [
-        "// Agent array variables",
-        f"const uint8_t {name}_ARRAY_SIZE = ?; // WARNING: this variable must be hard coded to have the same value as the one defined in the main python function.",
+        _ARRAY_COMMENT,
+        _ARRAY_SIZE_WARN.format(name=name),
         f"{element_type} {name}[{name}_ARRAY_SIZE] = {{}};",
         f"for (int i = 0; i < {name}_ARRAY_SIZE; i++) {{",
         f"  {name}[i] = FLAMEGPU->getVariable<{element_type}, {name}_ARRAY_SIZE>(\"{name}\", i);",
@@ -408,8 +649,8 @@ def _array_getter_block(name: str, element_type: str) -> list[str]:
 
 def _array_setter_block(name: str, element_type: str) -> list[str]:
     return [
-        "// Agent array variables",
-        f"const uint8_t {name}_ARRAY_SIZE = ?; // WARNING: this variable must be hard coded to have the same value as the one defined in the main python function.",
+        _ARRAY_COMMENT,
+        _ARRAY_SIZE_WARN.format(name=name),
         "",
         f"for (int i = 0; i < {name}_ARRAY_SIZE; i++) {{",
         f"  FLAMEGPU->setVariable<{element_type}, {name}_ARRAY_SIZE>(\"{name}\", i, {name}[i]);",
@@ -417,18 +658,12 @@ def _array_setter_block(name: str, element_type: str) -> list[str]:
     ]
 
 
+@lru_cache(maxsize=32)
 def _cpp_type_for(var_type: str | None) -> str:
-    mapping = {
-        "Float": "float",
-        "Int": "int",
-        "UInt8": "uint8_t",
-        "ArrayFloat": "float",
-        "ArrayUInt": "int",
-    }
-    key = var_type or DEFAULT_VAR_TYPE
-    return mapping.get(key, "float")
+    return _CPP_TYPE_MAP.get(var_type or DEFAULT_VAR_TYPE, "float")
 
 
+@lru_cache(maxsize=32)
 def _array_element_type(var_type: str | None) -> str:
     if var_type == "ArrayFloat":
         return "float"
@@ -440,15 +675,10 @@ def _array_element_type(var_type: str | None) -> str:
 def _indent_lines(lines: Iterable[str], indent: str = "  ") -> str:
     if not lines:
         return ""
-    indented: list[str] = []
-    for line in lines:
-        if line:
-            indented.append(f"{indent}{line}")
-        else:
-            indented.append("")
-    return "\n".join(indented)
+    return "\n".join(indent + line if line else "" for line in lines)
 
 
+@lru_cache(maxsize=8)
 def _default_cpp_value(cpp_type: str) -> str:
     if cpp_type in {"float", "double"}:
         return "0.0"
@@ -481,58 +711,71 @@ def _render_function_files(agents: Sequence[AgentType]) -> str:
     return "\n\n".join(blocks) if blocks else "# No agent function files declared"
 
 
-def _render_messages(agents: Sequence[AgentType]) -> tuple[str, set[str]]:
-    blocks: list[str] = []
+def _render_agent_blocks(
+    agents: Sequence[AgentType],
+    input_map: dict[tuple[str, str, str], str],
+) -> tuple[str, set[str], str, str]:
+    """Render the message, agent and logging blocks in one traversal of agents.
+
+    A single pass keeps each agent's functions and variables hot in cache while
+    all three blocks are emitted, instead of walking the model once per block.
+    """
+    msg_buf = io.StringIO()
+    agent_buf = io.StringIO()
+    log_buf = io.StringIO()
     spatial_agents: set[str] = set()
-    seen: set[tuple[str, str]] = set()
-    for agent in agents:
-        for func in agent.functions:
-            msg_type = func.output_type
-            if msg_type == "MessageNone":
-                continue
-            key = (agent.name, msg_type)
-            if key in seen:
-                continue
-            seen.add(key)
-            constructor = _MESSAGE_CONSTRUCTORS.get(msg_type)
-            msg_key = _MESSAGE_TYPE_KEYS.get(msg_type)
-            if not constructor or not msg_key:
-                continue
-            var_name = f"{agent.name}_{msg_key}_location_message"
-            if msg_type == "MessageBucket":
-                block_lines = [
-                    f"{agent.name}_MAX_CONNECTIVITY = ? # the maximum expected connectivity of each node",
-                    f"{agent.name}_N_NODES = ? # number of nodes in the bucket network",
-                    f"{var_name} = model.newMessageBucket(\"{agent.name}_bucket_location_message\")",
-                    "# Set the range and bounds.",
-                    f"{var_name}.setBounds(0,{agent.name}_N_NODES)",
-                ]
-            else:
-                block_lines = [
-                    f'{var_name} = model.{constructor}("{var_name}")'
-                ]
-            if msg_type == "MessageSpatial3D":
-                spatial_agents.add(agent.name)
-                block_lines.extend([
-                    f"{var_name}.setRadius(MAX_SEARCH_RADIUS_{agent.name})",
-                    f"{var_name}.setMin(MIN_EXPECTED_BOUNDARY_POS, MIN_EXPECTED_BOUNDARY_POS, MIN_EXPECTED_BOUNDARY_POS)",
-                    f"{var_name}.setMax(MAX_EXPECTED_BOUNDARY_POS, MAX_EXPECTED_BOUNDARY_POS, MAX_EXPECTED_BOUNDARY_POS)",
-                ])
-            elif msg_type == "MessageArray3D":
-                block_lines.extend([
-                    f"{agent.name}_AGENTS_PER_DIR = [?, ?, ?]",
-                    f"{var_name}.setDimensions({agent.name}_AGENTS_PER_DIR[0], {agent.name}_AGENTS_PER_DIR[1], {agent.name}_AGENTS_PER_DIR[2])",
-                ])
-
-            _append_agent_variables_to_message(block_lines, var_name, agent, msg_type)
-
-
-            block_lines.append(
-                "# TODO: add or remove variables manually to leave only those that need to be reported. If message type is MessageSpatial3D, variables x, y, z are included internally."
-            )
+    message_var_names: dict[tuple[str, str], str] = {}
+    seen: dict[str, set[str]] = {}
+    for index, agent in enumerate(agents):
+        _emit_agent_messages(msg_buf, agent, spatial_agents, message_var_names, seen)
+        _emit_agent_definition(agent_buf, index, agent, input_map, message_var_names)
+        _emit_agent_logging(log_buf, index, agent)
+    return (
+        msg_buf.getvalue() or "# No location messages defined",
+        spatial_agents,
+        agent_buf.getvalue() or "# No agents available",
+        log_buf.getvalue() or "# No agents available for logging configuration",
+    )
+
+
+def _emit_agent_messages(
+    buf: io.StringIO,
+    agent: AgentType,
+    spatial_agents: set[str],
+    message_var_names: dict[tuple[str, str], str],
+    seen: dict[str, set[str]],
+) -> None:
+    seen_types = seen.setdefault(agent.name, set())
+    for func in agent.functions:
+        msg_type = func.output_type
+        if msg_type == _MSG_NONE:
+            continue
+        if msg_type in seen_types:
+            continue
+        seen_types.add(msg_type)
+        meta = _MESSAGE_META.get(msg_type)
+        if meta is None:
+            continue
+        constructor, msg_key = meta
+        var_name = f"{agent.name}_{msg_key}_location_message"
+        message_var_names[(agent.name, msg_type)] = var_name
+        if msg_type == "MessageSpatial3D":
+            spatial_agents.add(agent.name)
+        template = _MESSAGE_BLOCK_TEMPLATES.get(msg_type, _GENERIC_MSG_TPL)
+        block_lines = [
+            template.format(agent_name=agent.name, var_name=var_name, constructor=constructor)
+        ]
+
+        _append_agent_variables_to_message(block_lines, var_name, agent, msg_type)
+
+
+        block_lines.append(
+            "# TODO: add or remove variables manually to leave only those that need to be reported. If message type is MessageSpatial3D, variables x, y, z are included internally."
+        )
 
-            blocks.append("\n".join(block_lines))
-    return ("\n\n".join(blocks) if blocks else "# No location messages defined"), spatial_agents
+        if buf.tell():
+            buf.write("\n\n")
+        buf.write("\n".join(block_lines))
 
 
 def _append_agent_variables_to_message(
@@ -546,102 +789,114 @@ def _append_agent_variables_to_message(
     def add_variable(name: str, var_type: str, default: str | None) -> None:
         if not name or name in handled:
             return
-        method = _AGENT_VARIABLE_METHODS.get(var_type, _AGENT_VARIABLE_METHODS[DEFAULT_VAR_TYPE])
+        method = _AGENT_VARIABLE_METHODS.get(var_type, _DEFAULT_AGENT_METHOD)
         if var_type in _ARRAY_TYPES:
             caster = float if var_type == "ArrayFloat" else int
             values = _parse_array(default, caster)
-            length_literal = str(len(values)) if values else "?"
-            if length_literal == "?":
+            if values:
                 block_lines.append(
-                    f'{message_var_name}.{method}("{name}", {length_literal}) # ? defines the length of the array variable'
+                    _MSG_ARRAY_EMIT.format(mv=message_var_name, m=method, n=name, l=len(values))
                 )
             else:
-                block_lines.append(f'{message_var_name}.{method}("{name}", {length_literal})')
+                block_lines.append(_MSG_ARRAY_EMIT_UNSIZED.format(mv=message_var_name, m=method, n=name))
         else:
-            block_lines.append(f'{message_var_name}.{method}("{name}")')
+            block_lines.append(_MSG_SCALAR_EMIT.format(mv=message_var_name, m=method, n=name))
         handled.add(name)
 
     skip_for_spatial = {"x", "y", "z"} if msg_type == "MessageSpatial3D" else set()
-    for var in getattr(agent, "variables", []):
-        var_name = getattr(var, "name", "")
+    for var in agent.variables:
+        var_name = var.name
         if not var_name or var_name in skip_for_spatial:
             continue
-        var_type = getattr(var, "var_type", DEFAULT_VAR_TYPE) or DEFAULT_VAR_TYPE
-        add_variable(var_name, var_type, getattr(var, "default", None))
+        add_variable(var_name, var.var_type or DEFAULT_VAR_TYPE, var.default)
 
 
-def _render_agents(agents: Sequence[AgentType], connections: Sequence[dict]) -> str:
-    if not agents:
-        return "# No agents available"
+def _plan_agent_variables(agent: AgentType) -> list[tuple[str, str, bool, str | None]]:
+    """Resolve (name, method, is_array, literal) per variable ahead of emission.
 
-    input_map = _build_input_map(connections)
-    blocks: list[str] = []
-    for agent in agents:
-        lines = [
-            '"""',
-            f"  {agent.name} agent",
-            '"""',
-            f'{agent.name}_agent = model.newAgent("{agent.name}")',
-        ]
+    Type dispatch and default parsing happen here once, leaving the emission
+    loop in _emit_agent_definition free of branches on variable types.
+    """
+    plan: list[tuple[str, str, bool, str | None]] = []
+    for var in agent.variables:
+        var_name = var.name
+        if not var_name:
+            continue
+        var_type = var.var_type or DEFAULT_VAR_TYPE
+        method = _AGENT_VARIABLE_METHODS.get(var_type, _DEFAULT_AGENT_METHOD)
+        if var_type in _ARRAY_TYPES:
+            plan.append((var_name, method, True, None))
+        elif (var.default or "").strip():
+            plan.append((var_name, method, False, _format_literal(var_type, var.default)))
+        else:
+            plan.append((var_name, method, False, None))
+    return plan
 
-        for var in agent.variables:
-            var_name = getattr(var, "name", "")
-            if not var_name:
-                continue
-            var_type = var.var_type or DEFAULT_VAR_TYPE
-            method = _AGENT_VARIABLE_METHODS.get(var_type, _AGENT_VARIABLE_METHODS[DEFAULT_VAR_TYPE])
-            if var_type in _ARRAY_TYPES:
-                lines.append(
-                    f'{agent.name}_agent.{method}("{var_name}", ?) # ? defines the length of the array variable'
-                )
-                lines.append("# TODO: default array values must be explicitly defined when initializing agent populations")
-            else:
-                default_raw = (getattr(var, "default", "") or "").strip()
-                if default_raw:
-                    literal = _format_literal(var_type, var.default)
-                    lines.append(f'{agent.name}_agent.{method}("{var_name}", {literal})')
-                else:
-                    lines.append(f'{agent.name}_agent.{method}("{var_name}")')
 
-        for func in agent.functions:
-            base = f'{agent.name}_agent.newRTCFunctionFile("{func.name}", {func.name}_file)'
-            suffix = ""
-            if func.output_type != "MessageNone":
-                msg_key = _MESSAGE_TYPE_KEYS.get(func.output_type)
-                if msg_key:
-                    suffix += f'.setMessageOutput("{agent.name}_{msg_key}_location_message")'
-            if func.input_type != "MessageNone":
-                msg_key = _MESSAGE_TYPE_KEYS.get(func.input_type)
-                source_agent = _input_source_agent(agent.name, func.name, func.input_type, input_map)
-                missing_input = False
-                if msg_key and source_agent:
-                    suffix += f'.setMessageInput("{source_agent}_{msg_key}_location_message")'
-                elif msg_key:
-                    missing_input = True
-                if missing_input:
-                    lines.append(f"# TODO: connect message input for {agent.name}::{func.name}")
-            lines.append(base + suffix)
-        blocks.append("\n".join(lines))
-    return "\n\n".join(blocks)
+def _emit_agent_definition(
+    buf: io.StringIO,
+    index: int,
+    agent: AgentType,
+    input_map: dict[tuple[str, str, str], str],
+    message_var_names: dict[tuple[str, str], str],
+) -> None:
+    if index:
+        buf.write("\n\n")
+    buf.write(f'"""\n  {agent.name} agent\n"""\n{agent.name}_agent = model.newAgent("{agent.name}")')
+
+    for var_name, method, is_array, literal in _plan_agent_variables(agent):
+        if is_array:
+            buf.write(
+                f'\n{agent.name}_agent.{method}("{var_name}", ?) # ? defines the length of the array variable'
+            )
+            buf.write("\n# TODO: default array values must be explicitly defined when initializing agent populations")
+        elif literal is not None:
+            buf.write(f'\n{agent.name}_agent.{method}("{var_name}", {literal})')
+        else:
+            buf.write(f'\n{agent.name}_agent.{method}("{var_name}")')
+
+    for func in agent.functions:
+        msg_key_out = _MESSAGE_TYPE_KEYS.get(func.output_type) if func.output_type != _MSG_NONE else None
+        msg_key_in = _MESSAGE_TYPE_KEYS.get(func.input_type) if func.input_type != _MSG_NONE else None
+        source_agent = input_map.get((agent.name, func.name, func.input_type)) if msg_key_in else None
+        if msg_key_in and not source_agent:
+            buf.write(f"\n# TODO: connect message input for {agent.name}::{func.name}")
+        if msg_key_out:
+            out_name = message_var_names.get(
+                (agent.name, func.output_type), f"{agent.name}_{msg_key_out}_location_message"
+            )
+            out_part = f'.setMessageOutput("{out_name}")'
+        else:
+            out_part = ""
+        if source_agent:
+            in_name = message_var_names.get(
+                (source_agent, func.input_type), f"{source_agent}_{msg_key_in}_location_message"
+            )
+            in_part = f'.setMessageInput("{in_name}")'
+        else:
+            in_part = ""
+        buf.write(
+            f'\n{agent.name}_agent.newRTCFunctionFile("{func.name}", {func.name}_file){out_part}{in_part}'
+        )
 
 
 def _render_layers(layers: Sequence[Layer]) -> str:
     if not layers:
         return "layer_count = 0\n# No layers defined"
 
-    lines = ["layer_count = 0"]
+    buf = io.StringIO()
+    buf.write("layer_count = 0")
     for layer in layers:
-        lines.append(f"# {layer.name}")
-        lines.append("layer_count += 1")
-        functions = list(getattr(layer, "function_ids", getattr(layer, "functions", [])))
+        buf.write(f"\n# {layer.name}\nlayer_count += 1")
+        functions = layer.function_ids
         for idx, func_id in enumerate(functions):
             try:
                 agent_name, func_name = func_id.split("::", 1)
             except ValueError:
                 continue
             layer_accessor = "newLayer" if idx == 0 else "Layer"
-            lines.append(f'model.{layer_accessor}("{layer.name}").addAgentFunction("{agent_name}", "{func_name}")')
-    return "\n".join(lines)
+            buf.write(f'\nmodel.{layer_accessor}("{layer.name}").addAgentFunction("{agent_name}", "{func_name}")')
+    return buf.getvalue()
 
 
 def _render_spatial_constants(spatial_agents: Iterable[str]) -> str:
@@ -651,24 +906,18 @@ def _render_spatial_constants(spatial_agents: Iterable[str]) -> str:
     return "\n".join(f"MAX_SEARCH_RADIUS_{name} = ?" for name in agents)
 
 
-def _render_logging(agents: Sequence[AgentType]) -> str:
-    if not agents:
-        return "# No agents available for logging configuration"
-
-    blocks: list[str] = []
-    for agent in agents:
-        lines = [
-            f'{agent.name}_agent_log = logging_config.agent("{agent.name}")',
-            f"{agent.name}_agent_log.logCount()",
-        ]
-        for var in getattr(agent, "variables", []):
-            log_mode = getattr(var, "logging", None)
-            method = _LOGGING_METHODS.get(log_mode)
-            if not method:
-                continue
-            lines.append(f'{agent.name}_agent_log.{method}("{var.name}")')
-        blocks.append("\n".join(lines))
-    return "\n\n".join(blocks)
+def _emit_agent_logging(buf: io.StringIO, index: int, agent: AgentType) -> None:
+    if index:
+        buf.write("\n\n")
+    buf.write(
+        f'{agent.name}_agent_log = logging_config.agent("{agent.name}")\n'
+        f"{agent.name}_agent_log.logCount()"
+    )
+    for var in agent.variables:
+        method = _LOGGING_METHODS.get(var.logging)
+        if not method:
+            continue
+        buf.write(f'\n{agent.name}_agent_log.{method}("{var.name}")')
 
 
 def _render_agent_logs(agents: Sequence[AgentType]) -> str:
@@ -676,19 +925,22 @@ def _render_agent_logs(agents: Sequence[AgentType]) -> str:
     if not agents:
         return indent + "# No agent log data available"
 
-    lines: list[str] = []
-    for agent in agents:
-        lines.append(f'{indent}{agent.name}_agents = step.getAgent("{agent.name}")')
-        lines.append(f'{indent}{agent.name}_agent_counts[counter] = {agent.name}_agents.getCount()')
-        for var in getattr(agent, "variables", []):
-            if _LOGGING_METHODS.get(getattr(var, "logging", None)):
-                lines.append(f'{indent}{var.name} = {agent.name}_agents.getSumFloat("{var.name}")')
-        lines.append("")
-    return "\n".join(lines).rstrip()
+    buf = io.StringIO()
+    for index, agent in enumerate(agents):
+        if index:
+            buf.write("\n\n")
+        buf.write(
+            f'{indent}{agent.name}_agents = step.getAgent("{agent.name}")\n'
+            f'{indent}{agent.name}_agent_counts[counter] = {agent.name}_agents.getCount()'
+        )
+        for var in agent.variables:
+            if _LOGGING_METHODS.get(var.logging):
+                buf.write(f'\n{indent}{var.name} = {agent.name}_agents.getSumFloat("{var.name}")')
+    return buf.getvalue()
 
 
 def _render_visualisation_blocks(
-    agents: Sequence[AgentType],
+    agent_lookup: dict[str, AgentType],
     visualization: VisualizationSettings | None,
 ) -> tuple[str, str]:
     if not visualization or not visualization.activated:
@@ -697,7 +949,7 @@ def _render_visualisation_blocks(
             "# Visualisation join disabled",
         )
 
-    domain_width_literal = _safe_numeric_literal(getattr(visualization, "domain_width", None))
+    domain_width_literal = _safe_numeric_literal(visualization.domain_width)
     begin_paused_literal = "True" if visualization.begin_paused else "False"
 
     lines: list[str] = [
@@ -716,86 +968,50 @@ def _render_visualisation_blocks(
         f"    vis.setBeginPaused({begin_paused_literal})",
     ]
 
-    agent_map = {agent.name: agent for agent in agents}
-    for agent_cfg in getattr(visualization, "agents", []):
-        if not getattr(agent_cfg, "include", False):
+    for agent_cfg in visualization.agents:
+        if not agent_cfg.include:
             continue
-        agent = agent_map.get(agent_cfg.agent_name)
+        agent = agent_lookup.get(agent_cfg.agent_name)
         if not agent:
             continue
 
         vis_var = f"{agent_cfg.agent_name}_vis_agent"
         shape = agent_cfg.shape if agent_cfg.shape in VISUALIZATION_SHAPES else DEFAULT_VISUALIZATION_SHAPE
         color_mode = agent_cfg.color_mode if agent_cfg.color_mode in VISUALIZATION_COLOR_MODES else DEFAULT_VISUALIZATION_COLOR
-        color_value = getattr(agent, "color", "#ffffff") or "#ffffff"
-
-        lines.append("")
-        lines.append(f"    {vis_var} = vis.addAgent(\"{agent_cfg.agent_name}\")")
-        lines.append("    # Position vars are named x, y, z so they are used by default")
-        lines.append(f"    {vis_var}.setModel(pyflamegpu.{shape})")
-        lines.append(f"    {vis_var}.setModelScale(? * domain_width) # values <<1 (e.g. 0.03) work fine")
+        color_value = agent.color or "#ffffff"
 
         if color_mode == _INTERPOLATED_MODE:
-            interpolation = getattr(agent_cfg, "interpolation", None)
+            interpolation = agent_cfg.interpolation
             variable_name = _resolve_interpolation_variable(interpolation, agent)
             min_value, max_value = _resolve_interpolation_bounds(interpolation)
-            lines.append(
+            color_line = (
                 f"    {vis_var}.setColor(pyflamegpu.HSVInterpolation.GREENRED(\"{variable_name}\", {min_value}, {max_value}))"
             )
         else:
-            lines.append(f"    {vis_var}.setColor(pyflamegpu.Color(\"{color_value}\"))")
+            color_line = f"    {vis_var}.setColor(pyflamegpu.Color(\"{color_value}\"))"
+
+        lines.append(
+            f"\n    {vis_var} = vis.addAgent(\"{agent_cfg.agent_name}\")\n"
+            "    # Position vars are named x, y, z so they are used by default\n"
+            f"    {vis_var}.setModel(pyflamegpu.{shape})\n"
+            f"    {vis_var}.setModelScale(? * domain_width) # values <<1 (e.g. 0.03) work fine\n"
+            f"{color_line}"
+        )
 
     if visualization.show_domain_boundaries:
-        lines.extend([
-            "",
-            "    coord_boundary = list(env.getPropertyArrayFloat(\"BOUNDARY_COORDS\"))",
-            "    pen = vis.newLineSketch(1, 1, 1, 0.8)",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[2], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[2], coord_boundary[5])",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[3], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[3], coord_boundary[5])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[2], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[2], coord_boundary[5])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[3], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[3], coord_boundary[5])",
-            "",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[2], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[3], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[2], coord_boundary[5])",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[3], coord_boundary[5])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[2], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[3], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[2], coord_boundary[5])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[3], coord_boundary[5])",
-            "",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[2], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[2], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[3], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[3], coord_boundary[4])",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[2], coord_boundary[5])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[2], coord_boundary[5])",
-            "    pen.addVertex(coord_boundary[0], coord_boundary[3], coord_boundary[5])",
-            "    pen.addVertex(coord_boundary[1], coord_boundary[3], coord_boundary[5])",
-        ])
+        lines.append("")
+        lines.append(_BOUNDARY_SKETCH_BLOCK)
 
     lines.append("")
     lines.append("    vis.activate()")
 
-    block_one = "\n".join(lines)
-
-    block_two_lines = [
-        "if pyflamegpu.VISUALISATION and VISUALISATION and not ENSEMBLE:",
-        "    vis.join() # join the visualisation thread and stops the visualisation closing after the simulation finishes",
-    ]
-    block_two = "\n".join(block_two_lines)
-
-    return block_one, block_two
+    return "\n".join(lines), _VIS_JOIN_BLOCK
 
 
 def _resolve_interpolation_variable(interpolation, agent: AgentType) -> str:
-    if interpolation and getattr(interpolation, "variable", ""):
+    if interpolation and interpolation.variable:
         return interpolation.variable
-    for var in getattr(agent, "variables", []):
+    for var in agent.variables:
         if var.name:
             return var.name
     return "?"
@@ -807,7 +1023,11 @@ def _resolve_interpolation_bounds(interpolation) -> tuple[str, str]:
     return _format_number(interpolation.min_value), _format_number(interpolation.max_value)
 
 
+@lru_cache(maxsize=256, typed=True)
 def _safe_numeric_literal(value, fallback: str = "?") -> str:
+    kind = type(value)
+    if kind is float or kind is int:
+        return _format_number(value)
     if value is None:
         return fallback
     if isinstance(value, (int, float)):
@@ -822,6 +1042,7 @@ def _safe_numeric_literal(value, fallback: str = "?") -> str:
     return _format_number(parsed)
 
 
+@lru_cache(maxsize=1024)
 def _format_literal(var_type: str | None, raw_value: str | None) -> str:
     var_type = var_type or DEFAULT_VAR_TYPE
     raw = (raw_value or "").strip()
@@ -829,18 +1050,14 @@ def _format_literal(var_type: str | None, raw_value: str | None) -> str:
         dims = _parse_shape_tokens(raw)
         if not dims:
             return raw or "?"
-        formatted: list[str] = []
-        for token in dims:
-            if isinstance(token, str):
-                formatted.append(token)
-            else:
-                formatted.append(_format_shape_dimension(token))
-        return ", ".join(formatted)
+        return ", ".join(
+            token if isinstance(token, str) else _format_shape_dimension(token) for token in dims
+        )
     if var_type in _ARRAY_TYPES:
         items = _parse_array(raw, float if var_type == "ArrayFloat" else int)
         if not items and raw:
             return raw
-        return "[" + ", ".join(_format_number(item) for item in items) + "]"
+        return "[" + ", ".join(map(_format_number, items)) + "]"
     if var_type == "Int":
         parsed = _parse_int(raw)
         if parsed == 0 and raw and raw.strip() not in {"0", "0.0"}:
@@ -861,23 +1078,16 @@ def _format_literal(var_type: str | None, raw_value: str | None) -> str:
 def _parse_array(raw: str | None, caster) -> list:
     if not raw:
         return []
-    value = raw.strip()
-    if value.startswith("[") and value.endswith("]"):
-        value = value[1:-1]
-    if not value:
-        return []
     items = []
-    for part in value.split(","):
-        piece = part.strip()
-        if not piece:
-            continue
+    for match in _ARRAY_TOKEN_RE.finditer(raw):
         try:
-            items.append(caster(piece))
+            items.append(caster(match.group()))
         except (TypeError, ValueError):
             continue
     return items
 
 
+@lru_cache(maxsize=256)
 def _parse_int(raw: str | None) -> int:
     try:
         return int(raw.strip()) if raw else 0
@@ -885,6 +1095,7 @@ def _parse_int(raw: str | None) -> int:
         return 0
 
 
+@lru_cache(maxsize=256)
 def _parse_float(raw: str | None) -> float:
     try:
         return float(raw.strip()) if raw else 0.0
@@ -892,14 +1103,21 @@ def _parse_float(raw: str | None) -> float:
         return 0.0
 
 
+@lru_cache(maxsize=256, typed=True)
 def _format_number(value: float | int) -> str:
-    if isinstance(value, int):
+    kind = type(value)
+    if kind is int:
+        return str(value)
+    if kind is float:
+        return repr(value)
+    if isinstance(value, int):  # bool and int subclasses
         return str(value)
     return repr(float(value))
 
 
+@lru_cache(maxsize=256, typed=True)
 def _format_shape_dimension(value: float | int) -> str:
-    if isinstance(value, int):
+    if type(value) is int or isinstance(value, int):
         return str(value)
     rounded = round(value)
     if abs(value - rounded) < 1e-9:
@@ -910,16 +1128,9 @@ def _format_shape_dimension(value: float | int) -> str:
 def _parse_shape_tokens(raw: str | None) -> list:
     if not raw:
         return []
-    value = raw.strip()
-    if value.startswith("[") and value.endswith("]"):
-        value = value[1:-1]
-    if not value:
-        return []
     tokens: list = []
-    for part in value.split(","):
-        piece = part.strip()
-        if not piece:
-            continue
+    for match in _ARRAY_TOKEN_RE.finditer(raw):
+        piece = match.group()
         if piece == "?":
             tokens.append("?")
             continue
@@ -930,21 +1141,28 @@ def _parse_shape_tokens(raw: str | None) -> list:
     return tokens
 
 
-def _build_input_map(connections: Sequence[dict]) -> dict[str, dict[str, str]]:
-    mapping: dict[str, dict[str, str]] = {}
-    for conn in connections:
-        dst = conn.get("dst")
-        src = conn.get("src")
-        msg_type = conn.get("type")
+def _build_input_map(connections: Sequence[dict]) -> dict[tuple[str, str, str], str]:
+    """Index connections as (target_agent, target_func, msg_type) -> source agent name.
+
+    Connection dicts are unhashable, so the cacheable work is delegated to a
+    helper keyed on a tuple of the relevant fields; batch exports with the same
+    connection list reuse the built index.
+    """
+    key = tuple((conn.get("dst"), conn.get("src"), conn.get("type")) for conn in connections)
+    return _build_input_map_cached(key)
+
+
+@lru_cache(maxsize=8)
+def _build_input_map_cached(
+    triples: tuple[tuple[str | None, str | None, str | None], ...],
+) -> dict[tuple[str, str, str], str]:
+    mapping: dict[tuple[str, str, str], str] = {}
+    for dst, src, msg_type in triples:
         if not dst or not src or not msg_type:
             continue
-        mapping.setdefault(dst, {})[msg_type] = src
+        try:
+            dst_agent, dst_func = dst.split("::", 1)
+        except ValueError:
+            continue
+        mapping[(dst_agent, dst_func, msg_type)] = src.split("::", 1)[0]
     return mapping
-
-
-def _input_source_agent(agent_name: str, func_name: str, msg_type: str, input_map: dict[str, dict[str, str]]) -> str | None:
-    dst_key = f"{agent_name}::{func_name}"
-    src_identifier = input_map.get(dst_key, {}).get(msg_type)
-    if not src_identifier:
-        return None
-    return src_identifier.split("::", 1)[0]
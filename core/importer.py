@@ -1,6 +1,11 @@
 from __future__ import annotations
 
 import ast
+import hashlib
+import itertools
+import pickle
+import re
+import sys
 from pathlib import Path
 from typing import Any, Iterable
 
@@ -50,18 +55,50 @@ _LOGGING_MODE_BY_METHOD = {
     "logStandardDev": "Std",
 }
 
-_DEFAULT_AGENT_COLORS = [
+# Node types that can never contain a Call or Assign underneath them; the
+# traversal skips them outright instead of recursing into empty subtrees.
+_LEAF_NODE_TYPES = (
+    ast.Constant,
+    ast.Name,
+    ast.expr_context,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+    ast.boolop,
+    ast.alias,
+)
+
+# Line breaks as the parser counts them; str.splitlines would also split on
+# form feeds and other control characters that do not advance ast linenos.
+_LINE_BREAK_RE = re.compile(r"\r\n?|\n")
+
+_DEFAULT_AGENT_COLORS = (
     "#e6194B", "#3cb44b", "#ffe119", "#4363d8", "#f58231",
     "#911eb4", "#46f0f0", "#f032e6", "#bcf60c", "#fabebe",
-]
+)
+
 
+class _ProjectAnalyzer:
+    # attr name -> unbound _handle_* method; filled in after the class body.
+    _call_handlers: dict[str, Any] = {}
 
-class _ProjectAnalyzer(ast.NodeVisitor):
     def __init__(self, source: str) -> None:
         self.source = source
+        self._color_iter = itertools.cycle(_DEFAULT_AGENT_COLORS)
+        # Cumulative start offset of each line; lets _source_for slice the
+        # source directly instead of re-splitting it per assignment. AST column
+        # offsets are byte-based, so the fast path only applies to ASCII sources.
+        self._source_is_ascii = source.isascii()
+        offsets = [0]
+        for match in _LINE_BREAK_RE.finditer(source):
+            offsets.append(match.end())
+        self._line_offsets = offsets
+        self._segment_cache: dict[int, str] = {}
+        self._global_type_cache: dict[tuple[int, str], str] = {}
         self.assignments: dict[str, str] = {}
         self.assignment_nodes: dict[str, ast.AST] = {}
         self.assignment_order: list[str] = []
+        self._assignment_order_set: set[str] = set()
         self.agent_vars: dict[str, str] = {}
         self.agents: dict[str, AgentType] = {}
         self.agent_variables: dict[str, list[AgentVariable]] = {}
@@ -74,19 +111,75 @@ class _ProjectAnalyzer(ast.NodeVisitor):
         self.layers: dict[str, list[str]] = {}
         self.env_properties: dict[str, GlobalVariable] = {}
         self.env_property_order: list[str] = []
+        self._env_order_set: set[str] = set()
         self.log_var_agents: dict[str, str] = {}
         self.logging_map: dict[str, dict[str, str]] = {}
         self.function_vars: dict[str, tuple[str, str]] = {}
 
-    def visit_Assign(self, node: ast.Assign) -> Any:
+    def analyze(self, tree: ast.Module) -> None:
+        """Collect Assign and Call nodes in one document-order walk, then process.
+
+        A plain iterative walk replaces the NodeVisitor recursion: function and
+        class bodies are pruned (module-level statements define the model) and
+        leaf nodes are never pushed at all.
+        """
+        assigns: list[ast.Assign] = []
+        nodes: list[ast.AST] = []
+        assign_rhs_ids: set[int] = set()
+        handlers = self._call_handlers
+        stack: list[ast.AST] = [tree]
+        while stack:
+            node = stack.pop()
+            kind = type(node)
+            if kind is ast.Assign:
+                assigns.append(node)
+                nodes.append(node)
+                if type(node.value) is ast.Call:
+                    # The assign handler dispatches its own RHS call inline;
+                    # keep it out of the call list to avoid double handling.
+                    assign_rhs_ids.add(id(node.value))
+            elif kind is ast.Call:
+                # Only calls a handler can act on are queued; everything else
+                # is traversed for its children but never dispatched.
+                if id(node) not in assign_rhs_ids:
+                    func = node.func
+                    if type(func) is ast.Attribute and (
+                        func.attr in handlers
+                        or func.attr.startswith("newMacroProperty")
+                    ):
+                        nodes.append(node)
+            elif kind in (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef):
+                continue
+            stack.extend(
+                child
+                for child in reversed(list(ast.iter_child_nodes(node)))
+                if not isinstance(child, _LEAF_NODE_TYPES)
+            )
+
+        # The name -> value table is completed first so call handlers can
+        # resolve argument expressions; the semantic handlers then run in
+        # document order, which fixes agent and layer ordering.
+        for node in assigns:
+            self._record_assignment(node)
+        for node in nodes:
+            if type(node) is ast.Assign:
+                self._process_assign(node)
+            else:
+                self._process_call(node)
+
+    def _record_assignment(self, node: ast.Assign) -> None:
         if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
             target_name = node.targets[0].id
             self.assignments[target_name] = self._source_for(node.value)
             self.assignment_nodes[target_name] = node.value
-            if target_name not in self.assignment_order:
+            if target_name not in self._assignment_order_set:
+                self._assignment_order_set.add(target_name)
                 self.assignment_order.append(target_name)
 
-        if isinstance(node.value, ast.Call) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+    def _process_assign(self, node: ast.Assign) -> Any:
+        if not isinstance(node.value, ast.Call):
+            return
+        if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
             target = node.targets[0].id
             call_attr = self._call_attr(node.value)
 
@@ -120,98 +213,113 @@ class _ProjectAnalyzer(ast.NodeVisitor):
                     self.layer_vars[target] = layer_name
                     self.layers.setdefault(layer_name, [])
 
-        self.generic_visit(node)
-
-    def visit_FunctionDef(self, node: ast.FunctionDef) -> Any:
-        return None
-
-    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> Any:
-        return None
-
-    def visit_ClassDef(self, node: ast.ClassDef) -> Any:
-        return None
-
-    def visit_Call(self, node: ast.Call) -> Any:
-        attr = self._call_attr(node)
-        value = self._call_value(node)
-
-        if attr in _GLOBAL_TYPE_BY_ENV_METHOD and self._is_name(value, "env"):
-            name = self._string_arg(node, 0)
-            if name:
-                var_type = _GLOBAL_TYPE_BY_ENV_METHOD[attr]
-                value_expr = self._resolve_value(node, 1)
-                self._set_global(name, value_expr, var_type, is_macro=False)
-
-        if attr and attr.startswith("newMacroProperty") and self._is_name(value, "env"):
-            name = self._string_arg(node, 0)
-            if name:
-                dims = [self._resolve_value(node, idx) for idx in range(1, len(node.args))]
-                value_expr = ", ".join(dim for dim in dims if dim) if dims else ""
-                var_type = SHAPE_VAR_TYPE if len(node.args) > 2 else "Float"
-                self._set_global(name, value_expr, var_type, is_macro=True)
-
-        if attr in _VAR_TYPE_BY_VAR_METHOD:
-            agent_name = self._agent_name_from_value(value)
-            if agent_name:
-                var_name = self._string_arg(node, 0)
-                if var_name:
-                    default_expr = self._resolve_value(node, 1)
-                    var_type = _VAR_TYPE_BY_VAR_METHOD[attr]
-                    self._add_agent_variable(agent_name, var_name, default_expr, var_type)
-
-        if attr == "newRTCFunctionFile":
-            agent_name = self._agent_name_from_value(value)
-            func_name = self._string_arg(node, 0)
-            if agent_name and func_name:
-                self._ensure_function(agent_name, func_name)
-
-        if attr in {"setMessageOutput", "setMessageInput"}:
-            func_call = value if isinstance(value, ast.Call) else None
-            if func_call and self._call_attr(func_call) == "newRTCFunctionFile":
-                agent_name = self._agent_name_from_value(self._call_value(func_call))
-                func_name = self._string_arg(func_call, 0)
-            elif isinstance(value, ast.Name) and value.id in self.function_vars:
-                agent_name, func_name = self.function_vars[value.id]
-            else:
-                agent_name, func_name = None, None
-
-            message_name = (self._string_arg(node, 0) or "").strip()
-            if agent_name and func_name and message_name:
-                self._ensure_function(agent_name, func_name)
-                msg_type = self._message_type_for(message_name)
-                if attr == "setMessageOutput":
-                    self._set_function_output(agent_name, func_name, message_name, msg_type)
-                else:
-                    self._set_function_input(agent_name, func_name, message_name, msg_type)
-
-        if attr == "addAgentFunction":
-            agent_name = self._string_arg(node, 0)
-            func_name = self._string_arg(node, 1)
-            if agent_name and func_name:
-                layer_name = None
-                if isinstance(value, ast.Call):
-                    inner_attr = self._call_attr(value)
-                    if inner_attr in {"newLayer", "Layer"}:
-                        layer_name = self._string_arg(value, 0)
-                elif isinstance(value, ast.Name):
-                    layer_name = self.layer_vars.get(value.id)
+        self._process_call(node.value)
 
-                if layer_name:
-                    self.layers.setdefault(layer_name, []).append(f"{agent_name}::{func_name}")
-
-        if attr in _LOGGING_MODE_BY_METHOD:
-            log_var = value.id if isinstance(value, ast.Name) else None
-            agent_name = self.log_var_agents.get(log_var) if log_var else None
+    def _process_call(self, node: ast.Call) -> Any:
+        func = node.func
+        if not isinstance(func, ast.Attribute):
+            return
+        attr = func.attr
+        value = func.value
+        recv_name = value.id if isinstance(value, ast.Name) else None
+
+        handler = self._call_handlers.get(attr)
+        if handler is not None:
+            handler(self, node, value, attr, recv_name)
+        elif attr.startswith("newMacroProperty"):
+            self._handle_macro_property(node, value, attr, recv_name)
+
+    def _handle_env_property(
+        self, node: ast.Call, value: ast.AST, attr: str, recv_name: str | None
+    ) -> None:
+        if recv_name != "env":
+            return
+        name = self._string_arg(node, 0)
+        if name:
+            var_type = _GLOBAL_TYPE_BY_ENV_METHOD[attr]
+            value_expr = self._resolve_value(node, 1)
+            self._set_global(name, value_expr, var_type, is_macro=False)
+
+    def _handle_macro_property(
+        self, node: ast.Call, value: ast.AST, attr: str, recv_name: str | None
+    ) -> None:
+        if recv_name != "env":
+            return
+        name = self._string_arg(node, 0)
+        if name:
+            dims = [self._resolve_value(node, idx) for idx in range(1, len(node.args))]
+            value_expr = ", ".join(dim for dim in dims if dim) if dims else ""
+            var_type = SHAPE_VAR_TYPE if len(node.args) > 2 else "Float"
+            self._set_global(name, value_expr, var_type, is_macro=True)
+
+    def _handle_agent_variable(
+        self, node: ast.Call, value: ast.AST, attr: str, recv_name: str | None
+    ) -> None:
+        agent_name = self.agent_vars.get(recv_name) if recv_name else None
+        if agent_name:
             var_name = self._string_arg(node, 0)
-            if agent_name and var_name:
-                self.logging_map.setdefault(agent_name, {})[var_name] = _LOGGING_MODE_BY_METHOD[attr]
-
-        self.generic_visit(node)
+            if var_name:
+                default_expr = self._resolve_value(node, 1)
+                var_type = _VAR_TYPE_BY_VAR_METHOD[attr]
+                self._add_agent_variable(agent_name, var_name, default_expr, var_type)
+
+    def _handle_function_file(
+        self, node: ast.Call, value: ast.AST, attr: str, recv_name: str | None
+    ) -> None:
+        agent_name = self.agent_vars.get(recv_name) if recv_name else None
+        func_name = self._string_arg(node, 0)
+        if agent_name and func_name:
+            self._ensure_function(agent_name, func_name)
+
+    def _handle_message_io(
+        self, node: ast.Call, value: ast.AST, attr: str, recv_name: str | None
+    ) -> None:
+        func_call = value if isinstance(value, ast.Call) else None
+        if func_call and self._call_attr(func_call) == "newRTCFunctionFile":
+            agent_name = self._agent_name_from_value(self._call_value(func_call))
+            func_name = self._string_arg(func_call, 0)
+        elif recv_name is not None and recv_name in self.function_vars:
+            agent_name, func_name = self.function_vars[recv_name]
+        else:
+            agent_name, func_name = None, None
+
+        message_name = (self._string_arg(node, 0) or "").strip()
+        if agent_name and func_name and message_name:
+            self._ensure_function(agent_name, func_name)
+            msg_type = self._message_type_for(message_name)
+            if attr == "setMessageOutput":
+                self._set_function_output(agent_name, func_name, message_name, msg_type)
+            else:
+                self._set_function_input(agent_name, func_name, message_name, msg_type)
+
+    def _handle_add_function(
+        self, node: ast.Call, value: ast.AST, attr: str, recv_name: str | None
+    ) -> None:
+        agent_name = self._string_arg(node, 0)
+        func_name = self._string_arg(node, 1)
+        if agent_name and func_name:
+            layer_name = None
+            if isinstance(value, ast.Call):
+                inner_attr = self._call_attr(value)
+                if inner_attr in {"newLayer", "Layer"}:
+                    layer_name = self._string_arg(value, 0)
+            elif recv_name is not None:
+                layer_name = self.layer_vars.get(recv_name)
+
+            if layer_name:
+                self.layers.setdefault(layer_name, []).append(f"{agent_name}::{func_name}")
+
+    def _handle_logging(
+        self, node: ast.Call, value: ast.AST, attr: str, recv_name: str | None
+    ) -> None:
+        agent_name = self.log_var_agents.get(recv_name) if recv_name else None
+        var_name = self._string_arg(node, 0)
+        if agent_name and var_name:
+            self.logging_map.setdefault(agent_name, {})[var_name] = _LOGGING_MODE_BY_METHOD[attr]
 
     def _ensure_agent(self, agent_name: str) -> None:
         if agent_name not in self.agents:
-            color = _DEFAULT_AGENT_COLORS[len(self.agents) % len(_DEFAULT_AGENT_COLORS)]
-            self.agents[agent_name] = AgentType(agent_name, color)
+            self.agents[agent_name] = AgentType(agent_name, next(self._color_iter))
             self.agent_variables[agent_name] = []
             self.agent_functions[agent_name] = {}
 
@@ -250,7 +358,8 @@ class _ProjectAnalyzer(ast.NodeVisitor):
         if var_type == SHAPE_VAR_TYPE:
             value_expr = self._strip_brackets(value_expr)
         self.env_properties[name] = GlobalVariable(name, value_expr, var_type, is_macro=is_macro)
-        if name not in self.env_property_order:
+        if name not in self._env_order_set:
+            self._env_order_set.add(name)
             self.env_property_order.append(name)
 
     def _message_type_for(self, message_name: str) -> str:
@@ -288,7 +397,9 @@ class _ProjectAnalyzer(ast.NodeVisitor):
             return None
         arg = node.args[index]
         if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
-            return arg.value
+            # Agent, function and message names are reused as dict keys all over
+            # the analyzer; interning makes those lookups pointer comparisons.
+            return sys.intern(arg.value)
         return None
 
     def _resolve_value(self, node: ast.Call, index: int) -> str:
@@ -300,7 +411,26 @@ class _ProjectAnalyzer(ast.NodeVisitor):
         return self._source_for(arg)
 
     def _source_for(self, node: ast.AST) -> str:
-        segment = ast.get_source_segment(self.source, node)
+        cached = self._segment_cache.get(id(node))
+        if cached is not None:
+            return cached
+        result = self._source_for_uncached(node)
+        # Keyed on id(): safe because the analyzer holds the tree alive for its
+        # whole lifetime, so ids cannot be recycled.
+        self._segment_cache[id(node)] = result
+        return result
+
+    def _source_for_uncached(self, node: ast.AST) -> str:
+        if self._source_is_ascii:
+            try:
+                start = self._line_offsets[node.lineno - 1] + node.col_offset
+                end = self._line_offsets[node.end_lineno - 1] + node.end_col_offset
+            except (AttributeError, IndexError, TypeError):
+                segment = None
+            else:
+                segment = self.source[start:end]
+        else:
+            segment = ast.get_source_segment(self.source, node)
         if segment:
             return segment.strip()
         try:
@@ -317,6 +447,14 @@ class _ProjectAnalyzer(ast.NodeVisitor):
         return trimmed
 
     def _infer_global_type(self, node: ast.AST | None, raw_value: str) -> str:
+        key = (id(node), raw_value)
+        cached = self._global_type_cache.get(key)
+        if cached is None:
+            cached = self._infer_global_type_uncached(node, raw_value)
+            self._global_type_cache[key] = cached
+        return cached
+
+    def _infer_global_type_uncached(self, node: ast.AST | None, raw_value: str) -> str:
         if isinstance(node, ast.Constant):
             if isinstance(node.value, bool):
                 return "Int"
@@ -325,16 +463,26 @@ class _ProjectAnalyzer(ast.NodeVisitor):
             if isinstance(node.value, float):
                 return "Float"
         if isinstance(node, (ast.List, ast.Tuple)):
-            numeric_types = []
+            has_float = False
             for elt in node.elts:
                 if isinstance(elt, ast.Constant) and isinstance(elt.value, (int, float)):
-                    numeric_types.append(float if isinstance(elt.value, float) else int)
+                    if isinstance(elt.value, float):
+                        has_float = True
                 else:
-                    numeric_types.append(None)
-            if numeric_types and all(t is not None for t in numeric_types):
-                return "ArrayFloat" if any(t is float for t in numeric_types) else "ArrayInt"
+                    return "ArrayFloat"
+            if node.elts:
+                return "ArrayFloat" if has_float else "ArrayInt"
             return "ArrayFloat"
-        if raw_value:
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)) and isinstance(node.operand, ast.Constant):
+            operand = node.operand.value
+            if isinstance(operand, float):
+                return "Float"
+            if isinstance(operand, int) and not isinstance(operand, bool):
+                return "Int"
+            return DEFAULT_VAR_TYPE
+        if node is None and raw_value:
+            # Only re-parse the raw text when no AST node was captured; with a
+            # node in hand every literal shape is classified above.
             try:
                 parsed = ast.literal_eval(raw_value)
             except Exception:
@@ -380,17 +528,22 @@ class _ProjectAnalyzer(ast.NodeVisitor):
 
         globals_: list[GlobalVariable] = []
         seen_globals: set[str] = set()
+        assignments = self.assignments
+        assignment_nodes = self.assignment_nodes
+        env_props = self.env_properties
+        infer = self._infer_global_type
+        strip = self._strip_brackets
         for name in self.assignment_order:
             if not name or not name[:1].isupper():
                 continue
-            raw_value = self.assignments.get(name, "")
-            node = self.assignment_nodes.get(name)
-            inferred_type = self._infer_global_type(node, raw_value)
+            raw_value = assignments.get(name, "")
+            node = assignment_nodes.get(name)
+            inferred_type = infer(node, raw_value)
             value_expr = raw_value
             if inferred_type in {"ArrayFloat", "ArrayInt", "ArrayUInt", SHAPE_VAR_TYPE}:
-                value_expr = self._strip_brackets(value_expr)
+                value_expr = strip(value_expr)
 
-            glob = self.env_properties.get(name)
+            glob = env_props.get(name)
             if glob:
                 glob.value = glob.value or value_expr
                 glob.var_type = glob.var_type or inferred_type
@@ -410,6 +563,86 @@ class _ProjectAnalyzer(ast.NodeVisitor):
         return agents, layers, globals_, connections
 
 
+# attr name -> handler; one hash probe in visit_Call replaces the chain of
+# membership tests previously run for every call in the file.
+_ProjectAnalyzer._call_handlers = {
+    **{attr: _ProjectAnalyzer._handle_env_property for attr in _GLOBAL_TYPE_BY_ENV_METHOD},
+    **{attr: _ProjectAnalyzer._handle_agent_variable for attr in _VAR_TYPE_BY_VAR_METHOD},
+    **{attr: _ProjectAnalyzer._handle_logging for attr in _LOGGING_MODE_BY_METHOD},
+    "newRTCFunctionFile": _ProjectAnalyzer._handle_function_file,
+    "setMessageOutput": _ProjectAnalyzer._handle_message_io,
+    "setMessageInput": _ProjectAnalyzer._handle_message_io,
+    "addAgentFunction": _ProjectAnalyzer._handle_add_function,
+}
+
+_AST_CACHE_DIR = Path.home() / ".cache" / "flamegpu2_uiconfig" / "ast"
+
+# (path, mtime_ns, size) -> parsed tree; survives repeated imports in a session.
+# Bounded LRU: dict insertion order doubles as recency, hits are reinserted and
+# the oldest entry is evicted once the cache is full.
+_AST_MEMORY_CACHE_SIZE = 64
+_ast_memory_cache: dict[tuple[str, int, int], ast.Module] = {}
+
+
+def _parse_cached(file_path: Path, source: str) -> ast.Module:
+    """Parse a project file, reusing cached trees when the source is unchanged.
+
+    ast.parse dominates import time, so trees are kept both in memory (keyed on
+    path and mtime) and pickled on disk (keyed on a hash of the source), the
+    latter shared across sessions. Cache failures silently fall back to parsing.
+    """
+    try:
+        stat = file_path.stat()
+        mem_key = (str(file_path), stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        mem_key = None
+    if mem_key is not None:
+        tree = _ast_memory_cache.pop(mem_key, None)
+        if tree is not None:
+            _ast_memory_cache[mem_key] = tree
+            return tree
+
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    cache_file = _AST_CACHE_DIR / (
+        f"{digest}-py{sys.version_info.major}.{sys.version_info.minor}.pkl"
+    )
+    tree = None
+    try:
+        with cache_file.open("rb") as handle:
+            tree = pickle.load(handle)
+    except (OSError, pickle.PickleError, EOFError, AttributeError):
+        tree = None
+    if tree is None:
+        tree = ast.parse(source)
+        try:
+            _AST_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            with cache_file.open("wb") as handle:
+                pickle.dump(tree, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        except (OSError, pickle.PickleError):
+            pass
+
+    if mem_key is not None:
+        # An edited file changes its (mtime, size) key; drop the stale trees so
+        # repeated edit/import cycles cannot pin old ASTs for the same path.
+        for stale in [key for key in _ast_memory_cache if key[0] == mem_key[0]]:
+            del _ast_memory_cache[stale]
+        while len(_ast_memory_cache) >= _AST_MEMORY_CACHE_SIZE:
+            del _ast_memory_cache[next(iter(_ast_memory_cache))]
+        _ast_memory_cache[mem_key] = tree
+    return tree
+
+
+# A file with none of these substrings cannot describe a model; checking the
+# raw bytes is far cheaper than parsing it to find that out.
+_MODEL_MARKERS = (
+    b"newAgent",
+    b"newMessage",
+    b"addAgentFunction",
+    b"newProperty",
+    b"newMacroProperty",
+)
+
+
 def import_project_file(file_path: Path) -> tuple[
     list[AgentType],
     list[Layer],
@@ -418,9 +651,12 @@ def import_project_file(file_path: Path) -> tuple[
     dict,
     VisualizationSettings | None,
 ]:
-    source = file_path.read_text(encoding="utf-8")
-    tree = ast.parse(source)
+    raw = file_path.read_bytes()
+    if not any(marker in raw for marker in _MODEL_MARKERS):
+        return [], [], [], [], {}, None
+    source = raw.decode("utf-8")
+    tree = _parse_cached(file_path, source)
     analyzer = _ProjectAnalyzer(source)
-    analyzer.visit(tree)
+    analyzer.analyze(tree)
     agents, layers, globals_, connections = analyzer.build()
     return agents, layers, globals_, connections, {}, None
@@ -15,34 +15,34 @@ DEFAULT_VISUALIZATION_SHAPE = VISUALIZATION_SHAPES[0]
 VISUALIZATION_COLOR_MODES = ["Solid", "Interpolated"]
 DEFAULT_VISUALIZATION_COLOR = VISUALIZATION_COLOR_MODES[0]
 
-@dataclass
+@dataclass(slots=True)
 class AgentVariable:
     name: str
     default: str
     var_type: str = DEFAULT_VAR_TYPE
     logging: str = DEFAULT_LOGGING_OPTION
 
-@dataclass
+@dataclass(slots=True)
 class AgentFunction:
     name: str
     description: str
     input_type: str
     output_type: str
 
-@dataclass
+@dataclass(slots=True)
 class AgentType:
     name: str
     color: str
     variables: List[AgentVariable] = field(default_factory=list)
     functions: List[AgentFunction] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Layer:
     name: str
     function_ids: List[str] = field(default_factory=list)
     height: Optional[float] = None
 
-@dataclass
+@dataclass(slots=True)
 class GlobalVariable:
     name: str
     value: str
@@ -50,14 +50,14 @@ class GlobalVariable:
     is_macro: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class VisualizationInterpolation:
     variable: str = ""
     min_value: float = 0.0
     max_value: float = 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class VisualizationAgentConfig:
     agent_name: str
     include: bool = False
@@ -66,7 +66,7 @@ class VisualizationAgentConfig:
     interpolation: VisualizationInterpolation | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class VisualizationSettings:
     activated: bool = False
     domain_width: str = ""
@@ -1,5 +1,10 @@
 import json
-from dataclasses import asdict
+from dataclasses import fields
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup only
+    orjson = None
 from core.models import (
     AgentType,
     AgentFunction,
@@ -12,32 +17,74 @@ from core.models import (
     DEFAULT_VISUALIZATION_COLOR,
     DEFAULT_VISUALIZATION_SHAPE,
     DEFAULT_VAR_TYPE,
+    DEFAULT_LOGGING_OPTION,
 )
 
 
-def save_config(filename, agents, layers, globals_, connections=None, layout=None, visualization: VisualizationSettings | None = None):
+_FIELD_NAMES_BY_CLASS: dict[type, tuple[str, ...]] = {}
+
+
+def _json_default(obj):
+    """Serialize dataclass instances without materializing asdict() copies."""
+    names = _FIELD_NAMES_BY_CLASS.get(obj.__class__)
+    if names is None:
+        names = tuple(f.name for f in fields(obj))
+        _FIELD_NAMES_BY_CLASS[obj.__class__] = names
+    return {name: getattr(obj, name) for name in names}
+
+
+def save_config(filename, agents, layers, globals_, connections=None, layout=None, visualization: VisualizationSettings | None = None, pretty: bool = True):
     data = {
-        "agents": [asdict(agent) for agent in agents],
-        "layers": [asdict(layer) for layer in layers],
-        "globals": [asdict(glob) for glob in globals_],
+        "agents": list(agents),
+        "layers": list(layers),
+        "globals": list(globals_),
         "connections": connections or [],
     }
     if layout:
         data["manual_layout"] = layout
     if visualization is not None:
-        data["visualization"] = asdict(visualization)
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+        data["visualization"] = visualization
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(data, default=_json_default, option=option))
+    else:
+        if pretty:
+            text = json.dumps(data, default=_json_default, indent=2)
+        else:
+            text = json.dumps(data, default=_json_default, separators=(',', ':'))
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(text)
 
 
 def load_config(filename):
-    with open(filename, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    if orjson is not None:
+        with open(filename, 'rb') as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(filename, 'rb') as f:
+            data = json.loads(f.read())
 
     agents = []
     for d in data.get("agents", []):
-        variables = [AgentVariable(**v) for v in d.get("variables", [])]
-        functions = [AgentFunction(**f) for f in d.get("functions", [])]
+        variables = [
+            AgentVariable(
+                v.get("name", ""),
+                v.get("default", ""),
+                v.get("var_type", DEFAULT_VAR_TYPE),
+                v.get("logging", DEFAULT_LOGGING_OPTION),
+            )
+            for v in d.get("variables", [])
+        ]
+        functions = [
+            AgentFunction(
+                f.get("name", ""),
+                f.get("description", ""),
+                f.get("input_type", ""),
+                f.get("output_type", ""),
+            )
+            for f in d.get("functions", [])
+        ]
         agents.append(AgentType(d.get("name", "Unnamed Agent"), d.get("color", "#ffffff"), variables, functions))
 
     layers = []
@@ -1,11 +1,30 @@
 import argparse
+import atexit
 import json
+from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font, PatternFill
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup only
+    orjson = None
+
+try:
+    import xlsxwriter
+except ImportError:  # pragma: no cover - optional speedup only
+    xlsxwriter = None
+
+_HEADER_FILL = PatternFill(fill_type="solid", fgColor="FFDDDDDD")
+_HEADER_FONT = Font(bold=True)
+_HEADER_ALIGN = Alignment(horizontal="center", vertical="center")
+_CENTER_ALIGN = Alignment(vertical="center")
+
 ALLOWED_BASE_TYPES = {
     "MessageNone",
     "MessageArray",
@@ -14,31 +33,39 @@ ALLOWED_BASE_TYPES = {
 }
 
 
+_NORM_PREFIXES = ("MessageSpatial", "MessageArray", "MessageBucket", "MessageNone")
+
+
 def normalize_message_type(message_type: str) -> str:
     """Normalize concrete FLAME GPU message types to the requested base labels."""
     if not message_type:
         return ""
 
     clean = message_type.strip()
-    if clean.startswith("MessageSpatial"):
-        return "MessageSpatial"
-    if clean.startswith("MessageArray"):
-        return "MessageArray"
-    if clean.startswith("MessageBucket"):
-        return "MessageBucket"
-    if clean.startswith("MessageNone"):
-        return "MessageNone"
+    for prefix in _NORM_PREFIXES:
+        if clean.startswith(prefix):
+            return prefix
     return clean
 
 
+@lru_cache(maxsize=64)
 def excel_hex(color: str) -> str:
     """Convert #RRGGBB or RRGGBB to openpyxl ARGB format."""
+    if color is not None and len(color) == 7 and color[0] == "#":
+        # Canonical "#RRGGBB" from the agent models; skip the strip dance.
+        return "FF" + color[1:].upper()
     raw = (color or "").strip().lstrip("#")
     if len(raw) != 6:
         return "FFFFFFFF"
     return f"FF{raw.upper()}"
 
 
+@lru_cache(maxsize=64)
+def _fill_for(color: str) -> PatternFill:
+    """Shared solid fill per agent color; avoids one PatternFill per cell."""
+    return PatternFill(fill_type="solid", fgColor=excel_hex(color))
+
+
 def parse_function_id(function_id: str) -> Tuple[str, str]:
     if "::" not in function_id:
         raise ValueError(f"Invalid function id: {function_id}")
@@ -92,49 +119,59 @@ def build_rows(config: Dict[str, Any]) -> List[Dict[str, Any]]:
     layers = config.get("layers", [])
     connections = config.get("connections", [])
 
-    # function lookup: "agent::function" -> function dict
-    function_lookup: Dict[str, Dict[str, Any]] = {}
+    # "agent::function" -> normalized message types, computed once here
+    # rather than per layer reference below
     agent_color_lookup: Dict[str, str] = {}
+    norm_input: Dict[str, str] = {}
+    norm_output: Dict[str, str] = {}
 
     for agent in agents:
         agent_name = agent.get("name", "")
         agent_color_lookup[agent_name] = agent.get("color", "#FFFFFF")
         for function in agent.get("functions", []):
             function_name = function.get("name", "")
-            fid = f"{agent_name}::{function_name}"
-            function_lookup[fid] = function
+            fid = "::".join((agent_name, function_name))
+            norm_input[fid] = normalize_message_type(function.get("input_type", ""))
+            norm_output[fid] = normalize_message_type(function.get("output_type", ""))
 
     # dst function -> list of (sender_agent, message_type)
-    dst_sender_agents: Dict[str, List[Tuple[str, str]]] = {}
+    dst_sender_agents: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
     for conn in connections:
         src = conn.get("src", "")
         dst = conn.get("dst", "")
         if "::" in src and "::" in dst:
-            sender_agent, _ = parse_function_id(src)
+            sender_agent = src.split("::", 1)[0]
             message_type = normalize_message_type(conn.get("type", ""))
-            dst_sender_agents.setdefault(dst, []).append((sender_agent, message_type))
+            dst_sender_agents[dst].append((sender_agent, message_type))
 
     rows: List[Dict[str, Any]] = []
+    rows_append = rows.append
+    input_get = norm_input.get
+    output_get = norm_output.get
+    senders_get = dst_sender_agents.get
+    color_get = agent_color_lookup.get
 
     for layer in layers:
         layer_name = layer.get("name", "")
         for function_id in layer.get("function_ids", []):
-            if function_id not in function_lookup:
+            # One probe doubles as the "known function" membership test.
+            input_type = input_get(function_id)
+            if input_type is None:
                 continue
 
             owner_agent, function_name = parse_function_id(function_id)
-            fn = function_lookup[function_id]
-            input_type = normalize_message_type(fn.get("input_type", ""))
-            output_type = normalize_message_type(fn.get("output_type", ""))
+            output_type = output_get(function_id, "")
 
             sender_agent: Optional[str] = None
             if input_type != "MessageNone":
-                candidates = dst_sender_agents.get(function_id, [])
+                candidates = senders_get(function_id)
                 if candidates:
-                    exact_matches = [agent for agent, msg_type in candidates if msg_type == input_type]
-                    sender_agent = exact_matches[0] if exact_matches else candidates[0][0]
+                    sender_agent = next(
+                        (agent for agent, msg_type in candidates if msg_type == input_type),
+                        candidates[0][0],
+                    )
 
-            rows.append(
+            rows_append(
                 {
                     "layer_name": layer_name,
                     "function_name": function_name,
@@ -142,8 +179,8 @@ def build_rows(config: Dict[str, Any]) -> List[Dict[str, Any]]:
                     "output_type": output_type,
                     "owner_agent": owner_agent,
                     "sender_agent": sender_agent,
-                    "owner_color": agent_color_lookup.get(owner_agent, "#FFFFFF"),
-                    "sender_color": agent_color_lookup.get(sender_agent or "", "#FFFFFF"),
+                    "owner_color": color_get(owner_agent, "#FFFFFF"),
+                    "sender_color": color_get(sender_agent or "", "#FFFFFF"),
                 }
             )
 
@@ -151,62 +188,105 @@ def build_rows(config: Dict[str, Any]) -> List[Dict[str, Any]]:
 
 
 def write_excel(rows: List[Dict[str, Any]], output_path: Path) -> None:
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Functions"
+    if xlsxwriter is not None:
+        _write_excel_xlsxwriter(rows, output_path)
+    else:
+        _write_excel_openpyxl(rows, output_path)
+
+
+def _write_excel_xlsxwriter(rows: List[Dict[str, Any]], output_path: Path) -> None:
+    # constant_memory flushes each row to disk as soon as the next one starts,
+    # which fits this strictly top-to-bottom writer and keeps memory flat.
+    wb = xlsxwriter.Workbook(str(output_path), {
+        "constant_memory": True,
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+    })
+    ws = wb.add_worksheet("Functions")
+    ws.set_column(0, 0, 28)
+    ws.set_column(1, 1, 36)
+    ws.set_column(2, 3, 18)
+
+    header_fmt = wb.add_format({
+        "bold": True,
+        "bg_color": "#DDDDDD",
+        "align": "center",
+        "valign": "vcenter",
+    })
+    center_fmt = wb.add_format({"valign": "vcenter"})
+    fill_fmts: Dict[str, Any] = {}
+
+    def fmt_for(color: str):
+        key = "#" + excel_hex(color)[2:]
+        fmt = fill_fmts.get(key)
+        if fmt is None:
+            fmt = wb.add_format({"bg_color": key, "valign": "vcenter"})
+            fill_fmts[key] = fmt
+        return fmt
+
+    ws.write_row(0, 0, ("Layer name", "Function name", "Input type", "Output type"), header_fmt)
+
+    for row_idx, row_data in enumerate(rows, start=1):
+        ws.write(row_idx, 0, row_data["layer_name"], center_fmt)
+        ws.write(row_idx, 1, row_data["function_name"], fmt_for(row_data["owner_color"]))
 
-    headers = ["Layer name", "Function name", "Input type", "Output type"]
-    ws.append(headers)
+        input_type = row_data["input_type"]
+        if input_type in ALLOWED_BASE_TYPES and input_type != "MessageNone":
+            ws.write(row_idx, 2, input_type, fmt_for(row_data["sender_color"]))
+        else:
+            ws.write(row_idx, 2, input_type, center_fmt)
 
-    header_fill = PatternFill(fill_type="solid", fgColor="FFDDDDDD")
-    header_font = Font(bold=True)
+        output_type = row_data["output_type"]
+        if output_type in ALLOWED_BASE_TYPES and output_type != "MessageNone":
+            ws.write(row_idx, 3, output_type, fmt_for(row_data["owner_color"]))
+        else:
+            ws.write(row_idx, 3, output_type, center_fmt)
 
-    for col in range(1, 5):
-        cell = ws.cell(row=1, column=col)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center", vertical="center")
+    wb.close()
 
-    for row_data in rows:
-        ws.append(
-            [
-                row_data["layer_name"],
-                row_data["function_name"],
-                row_data["input_type"],
-                row_data["output_type"],
-            ]
-        )
 
-        row_idx = ws.max_row
+def _write_excel_openpyxl(rows: List[Dict[str, Any]], output_path: Path) -> None:
+    # Write-only mode streams rows straight to disk instead of keeping a cell
+    # object per value in memory, so styles and column widths must be set as
+    # the rows are built (cells cannot be revisited afterwards).
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Functions")
 
-        function_fill = PatternFill(
-            fill_type="solid",
-            fgColor=excel_hex(row_data["owner_color"]),
-        )
-        ws.cell(row=row_idx, column=2).fill = function_fill
+    ws.column_dimensions["A"].width = 28
+    ws.column_dimensions["B"].width = 36
+    ws.column_dimensions["C"].width = 18
+    ws.column_dimensions["D"].width = 18
+
+    header_row = []
+    for title in ("Layer name", "Function name", "Input type", "Output type"):
+        cell = WriteOnlyCell(ws, value=title)
+        cell.fill = _HEADER_FILL
+        cell.font = _HEADER_FONT
+        cell.alignment = _HEADER_ALIGN
+        header_row.append(cell)
+    ws.append(header_row)
+
+    for row_data in rows:
+        layer_cell = WriteOnlyCell(ws, value=row_data["layer_name"])
+        layer_cell.alignment = _CENTER_ALIGN
+
+        function_cell = WriteOnlyCell(ws, value=row_data["function_name"])
+        function_cell.alignment = _CENTER_ALIGN
+        function_cell.fill = _fill_for(row_data["owner_color"])
 
         input_type = row_data["input_type"]
-        sender_color = row_data["sender_color"]
+        input_cell = WriteOnlyCell(ws, value=input_type)
+        input_cell.alignment = _CENTER_ALIGN
         if input_type in ALLOWED_BASE_TYPES and input_type != "MessageNone":
-            input_fill = PatternFill(fill_type="solid", fgColor=excel_hex(sender_color))
-            ws.cell(row=row_idx, column=3).fill = input_fill
+            input_cell.fill = _fill_for(row_data["sender_color"])
 
         output_type = row_data["output_type"]
+        output_cell = WriteOnlyCell(ws, value=output_type)
+        output_cell.alignment = _CENTER_ALIGN
         if output_type in ALLOWED_BASE_TYPES and output_type != "MessageNone":
-            output_fill = PatternFill(
-                fill_type="solid",
-                fgColor=excel_hex(row_data["owner_color"]),
-            )
-            ws.cell(row=row_idx, column=4).fill = output_fill
-
-    ws.column_dimensions["A"].width = 28
-    ws.column_dimensions["B"].width = 36
-    ws.column_dimensions["C"].width = 18
-    ws.column_dimensions["D"].width = 18
+            output_cell.fill = _fill_for(row_data["owner_color"])
 
-    for row in ws.iter_rows(min_row=2, max_col=4):
-        for cell in row:
-            cell.alignment = Alignment(vertical="center")
+        ws.append([layer_cell, function_cell, input_cell, output_cell])
 
     wb.save(output_path)
 
@@ -215,22 +295,39 @@ def default_output_path(config_path: Path) -> Path:
     return config_path.with_name(f"{config_path.stem}_functions.xlsx")
 
 
+_tk_root = None
+
+
+def _destroy_tk_root() -> None:
+    global _tk_root
+    if _tk_root is not None:
+        try:
+            _tk_root.destroy()
+        except Exception:
+            pass
+        _tk_root = None
+
+
 def pick_config_file(initial_dir: Optional[Path] = None) -> Optional[Path]:
+    global _tk_root
     try:
         import tkinter as tk
         from tkinter import filedialog
     except Exception:
         return None
 
-    root = tk.Tk()
-    root.withdraw()
-    root.update()
+    # Keep one hidden root alive so repeated picks skip Tcl start-up.
+    if _tk_root is None:
+        _tk_root = tk.Tk()
+        _tk_root.withdraw()
+        atexit.register(_destroy_tk_root)
+    _tk_root.update()
     filename = filedialog.askopenfilename(
+        parent=_tk_root,
         title="Select configuration JSON file",
         initialdir=str((initial_dir or Path.cwd()).resolve()),
         filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")],
     )
-    root.destroy()
     if not filename:
         return None
     return Path(filename).resolve()
@@ -260,8 +357,9 @@ def main() -> None:
     if not config_path.exists():
         raise FileNotFoundError(f"Config file not found: {config_path}")
 
-    with config_path.open("r", encoding="utf-8") as file:
-        config = json.load(file)
+    with config_path.open("rb") as file:
+        raw = file.read()
+    config = orjson.loads(raw) if orjson is not None else json.loads(raw)
 
     rows = build_rows(config)
     output_path = Path(args.output).resolve() if args.output else default_output_path(config_path)
@@ -1,6 +1,6 @@
 from typing import Dict, List, Tuple, Optional
-from PySide6.QtCore import QPointF, QRectF, Qt
-from PySide6.QtGui import QColor
+from PySide6.QtCore import QPointF, QRectF, Qt, QTimer
+from PySide6.QtGui import QColor, QPen
 from PySide6.QtWidgets import QGraphicsScene
 from core.signals import signals
 from core.models import AgentType
@@ -9,11 +9,17 @@ from .items import (
     AGENT_R, BAND_PAD, H_SPACING
 )
 
+# Cell size of the broad-phase grid used for function-box hit testing.
+GRID_CELL = 128.0
+
 
 class CanvasScene(QGraphicsScene):
     def __init__(self):
         super().__init__()
         self.setSceneRect(0, 0, 4000, 3000)
+        # Scenes this size are cheaper to repaint linearly than to keep the
+        # default BSP index balanced across the add/remove churn of rebuild().
+        self.setItemIndexMethod(QGraphicsScene.NoIndex)
 
         # Data caches
         self._agents_by_name: Dict[str, AgentType] = {}
@@ -22,12 +28,16 @@ class CanvasScene(QGraphicsScene):
 
         # Graphics indexes
         self._bands: List[LayerBandItem] = []
+        self._bands_by_name: Dict[str, LayerBandItem] = {}
         self._agent_items: Dict[Tuple[str, str], AgentNodeItem] = {}    # (layer_name, agent_name) -> item
         self._func_items: Dict[str, List[FunctionNodeItem]] = {}         # "Agent::Func" -> [items]
-        self._connections: List[ConnectionItem] = []
+        self._func_item_by_layer: Dict[Tuple[str, str], FunctionNodeItem] = {}  # (layer_name, "Agent::Func") -> item
+        self._fn_grid: Dict[Tuple[int, int], List[FunctionNodeItem]] = {}
+        self._fn_grid_cells: Dict[FunctionNodeItem, List[Tuple[int, int]]] = {}
+        self._node_items: List = []  # every band/agent/function item of the last rebuild
+        self._connections: Dict[tuple, ConnectionItem] = {}      # conn key -> item
         self._agent_connections: List[AgentConnectionItem] = []
-        self._connection_specs: List[dict] = []
-        self._connection_keys = set()
+        self._connection_specs: Dict[tuple, dict] = {}            # conn key -> spec
         self._connections_need_sync = False
         self._agent_position_cache: Dict[Tuple[str, str], QPointF] = {}
         self._func_position_cache: Dict[Tuple[Optional[str], str], QPointF] = {}
@@ -36,6 +46,14 @@ class CanvasScene(QGraphicsScene):
         # Drag-wire state
         self._drag_src: FunctionNodeItem | None = None
         self._drag_temp: ConnectionItem | None = None
+        self._drag_last_pos: QPointF | None = None
+        self._drag_tick = QTimer(self)
+        self._drag_tick.setSingleShot(True)
+        self._drag_tick.setInterval(16)
+        self._drag_tick.timeout.connect(self._update_drag_wire)
+
+        # Primary view, resolved lazily for hit-test fallbacks
+        self._primary_view = None
 
         # Manual layout state
         self.manual_mode = False
@@ -70,12 +88,36 @@ class CanvasScene(QGraphicsScene):
         # positions stay as-is when toggling manual mode off
 
     def _add_or_update_agent(self, a: AgentType):
+        prev = self._agents_by_name.get(a.name)
         self._agents_by_name[a.name] = a
+        if prev is not None and prev.functions == a.functions:
+            # Function boxes and wiring are unchanged, so patch the color in
+            # place instead of tearing down and recreating the whole scene.
+            if prev.color != a.color:
+                self._recolor_agent(a.name, QColor(a.color))
+            return
+        if prev is None and not any(
+            f.startswith(f"{a.name}::")
+            for L in self._layers
+            for f in L.get("functions", [])
+        ):
+            # A new agent only appears once a layer references one of its
+            # functions; nothing on the canvas changes yet.
+            return
         self.rebuild()
 
+    def _recolor_agent(self, name: str, color: QColor):
+        for (_, agent_name), ag_item in self._agent_items.items():
+            if agent_name != name:
+                continue
+            ag_item.color = color
+            ag_item.update()
+            for link in self._edges_by_agent.get(ag_item, []):
+                link.color = color
+                link.setPen(QPen(color, 2.0))
+
     def _remove_agent(self, name: str):
-        if name in self._agents_by_name:
-            del self._agents_by_name[name]
+        self._agents_by_name.pop(name, None)
         # purge any functions in layers referencing this agent
         for L in self._layers:
             L["functions"] = [f for f in L["functions"] if not f.startswith(f"{name}::")]
@@ -104,15 +146,36 @@ class CanvasScene(QGraphicsScene):
 
     # ----- Rebuild layout -----------------------------------------------------
     def rebuild(self):
-        self.clear()
+        # Diff-and-reuse: bands, agent circles and function boxes that survive
+        # the change are repositioned in place; only the delta is created or
+        # destroyed. Connectors are cheap and always rebuilt from scratch.
+        for link in self._agent_connections:
+            if link.scene() is self:
+                self.removeItem(link)
         self._clear_edge_registry()
-        self._bands.clear()
-        self._agent_items.clear()
-        self._func_items.clear()
-        self._connections.clear()
+        self._remove_all_manual_connections()
         self._connections_need_sync = True
 
+        # The identity list drives the stale sweep: the keyed maps above are
+        # only reuse hints and can lose entries to duplicate layer or function
+        # names, which must not leak the overwritten items.
+        old_items = self._node_items
+        self._node_items = []
+        stale_bands = self._bands_by_name
+        stale_agents = self._agent_items
+        stale_funcs = self._func_item_by_layer
+        self._bands = []
+        self._bands_by_name = {}
+        self._agent_items = {}
+        self._func_items = {}
+        self._func_item_by_layer = {}
+
         if not self._layers:
+            for item in old_items:
+                if isinstance(item, FunctionNodeItem):
+                    self._grid_remove(item)
+                if item.scene() is self:
+                    self.removeItem(item)
             return
 
         # Simple vertical stacking of layer bands
@@ -128,55 +191,79 @@ class CanvasScene(QGraphicsScene):
                 self._layer_heights.get(band_name, default_height)
             )
             rect = QRectF(left, y, right - left, band_h)
-            band = LayerBandItem(L["name"], rect)
-            band.set_height_change_callback(lambda h, layer_name=band_name: self._on_band_height_changed(layer_name, h))
+            band = stale_bands.pop(band_name, None)
+            if band is None:
+                band = LayerBandItem(band_name, rect)
+                band.set_height_change_callback(lambda h, layer_name=band_name: self._on_band_height_changed(layer_name, h))
+                self.addItem(band)
+            else:
+                band.set_top_and_height(y, band_h)
             band.set_interactive(self.manual_mode)
-            self.addItem(band)
             self._bands.append(band)
+            self._bands_by_name[band_name] = band
+            self._node_items.append(band)
             self._layer_heights[band_name] = band_h
 
-            # Which agents are present in this layer?
-            funcs = [f for f in L.get("functions", []) if "::" in f]
-            agents_here: List[str] = []
-            for f in funcs:
-                ag_name, _ = f.split("::", 1)
-                if ag_name not in agents_here:
-                    agents_here.append(ag_name)
+            # Group this layer's functions by owning agent in one pass;
+            # insertion order doubles as the horizontal agent order.
+            by_agent: Dict[str, List[Tuple[str, str]]] = {}
+            for f in L.get("functions", []):
+                if "::" in f:
+                    ag_part, fn_part = f.split("::", 1)
+                    by_agent.setdefault(ag_part, []).append((f, fn_part))
 
             # Horizontal placement of agents
-            if agents_here:
+            if by_agent:
                 x = rect.left() + BAND_PAD + AGENT_R
                 center_y = rect.center().y() - 12.0
-                for ag_name in agents_here:
+                for ag_name, f_for_agent in by_agent.items():
                     ag = self._agents_by_name.get(ag_name)
                     if not ag:
                         continue
+                    fn_meta_by_name = {ff.name: ff for ff in ag.functions}
 
                     # Agent circle
-                    ag_item = AgentNodeItem(ag_name, QColor(ag.color))
+                    agent_key = (band_name, ag_name)
+                    ag_item = stale_agents.pop(agent_key, None)
+                    if ag_item is None:
+                        ag_item = AgentNodeItem(ag_name, QColor(ag.color))
+                        self.addItem(ag_item)
+                        ag_item.on_moved = self._on_agent_moved
+                        ag_item.layer_name = band_name
+                    else:
+                        ag_item.color = QColor(ag.color)
+                        ag_item.update()
                     ag_item.setPos(QPointF(x, center_y))
-                    self.addItem(ag_item)
-                    self._agent_items[(L["name"], ag_name)] = ag_item
+                    self._agent_items[agent_key] = ag_item
+                    self._node_items.append(ag_item)
                     ag_item.set_movable(self.manual_mode)
-                    ag_item.on_moved = self._on_agent_moved
-                    ag_item.layer_name = L["name"]
                     self._edges_by_agent.setdefault(ag_item, [])
 
-                    # Functions belonging to this agent in this layer
-                    f_for_agent = [f for f in funcs if f.startswith(f"{ag_name}::")]
-
                     # Create all function items first so we know their sizes
                     fn_items: List[FunctionNodeItem] = []
-                    for f_id in f_for_agent:
-                        f_name = f_id.split("::", 1)[1]
-                        f_meta = next((ff for ff in ag.functions if ff.name == f_name), None)
+                    for f_id, f_name in f_for_agent:
+                        f_meta = fn_meta_by_name.get(f_name)
                         if not f_meta:
                             continue
-                        fn_item = FunctionNodeItem(ag_name, f_name, f_meta.input_type, f_meta.output_type)
-                        self.addItem(fn_item)
-                        fn_item.layer_name = L["name"]
-                        self._func_items.setdefault(f"{ag_name}::{f_name}", []).append(fn_item)
-                        fn_item.on_moved = self._on_func_moved
+                        func_key = (band_name, f_id)
+                        fn_item = stale_funcs.pop(func_key, None)
+                        if fn_item is not None and (
+                            fn_item.in_type != f_meta.input_type
+                            or fn_item.out_type != f_meta.output_type
+                        ):
+                            # Message types feed the box tooltip and wiring
+                            # validation; simplest to start fresh.
+                            self._grid_remove(fn_item)
+                            self.removeItem(fn_item)
+                            fn_item = None
+                        if fn_item is None:
+                            fn_item = FunctionNodeItem(ag_name, f_name, f_meta.input_type, f_meta.output_type)
+                            self.addItem(fn_item)
+                            fn_item.layer_name = band_name
+                            fn_item.on_moved = self._on_func_moved
+                        self._func_items.setdefault(f_id, []).append(fn_item)
+                        self._func_item_by_layer[func_key] = fn_item
+                        self._node_items.append(fn_item)
                         self._edges_by_func.setdefault(fn_item, [])
                         fn_item.set_movable(self.manual_mode)
                         fn_items.append(fn_item)
@@ -185,15 +272,17 @@ class CanvasScene(QGraphicsScene):
                     if fn_items:
                         # left edge for rectangles clear of the circle
                         base_left = x + AGENT_R + 24.0    # gap from circle
-                        total_h = sum(it.rect().height() for it in fn_items) + 6.0 * (len(fn_items) - 1)
+                        inner_gap = 8.0
+                        # fetch each rect once; the sizes drive both the total
+                        # height and the per-item placement below
+                        sizes = [(it.rect().width(), it.rect().height()) for it in fn_items]
+                        total_h = sum(h for _, h in sizes) + 6.0 * (len(fn_items) - 1)
                         cur_y = center_y - total_h * 0.5
                         max_w = 0.0
-                        for it in fn_items:
-                            w = it.rect().width()
-                            h = it.rect().height()
-                            max_w = max(max_w, w)
+                        for it, (w, h) in zip(fn_items, sizes):
+                            if w > max_w:
+                                max_w = w
                             # set center so that left edge stays at base_left + inner gap
-                            inner_gap = 8.0
                             it.setPos(QPointF(base_left + inner_gap + w * 0.5, cur_y + h * 0.5))
                             cur_y += h + 6.0
 
@@ -216,6 +305,15 @@ class CanvasScene(QGraphicsScene):
 
             y += band_h + band_spacing
 
+        placed = set(self._node_items)
+        for item in old_items:
+            if item in placed:
+                continue
+            if isinstance(item, FunctionNodeItem):
+                self._grid_remove(item)
+            if item.scene() is self:
+                self.removeItem(item)
+
         self._restore_connections_from_specs(force=True)
         self._apply_manual_positions()
         # Enable interactive wiring
@@ -236,17 +334,21 @@ class CanvasScene(QGraphicsScene):
 
     def mouseMoveEvent(self, event):
         if self._drag_temp and self._drag_src:
-            # update temp path to current mouse as 'dst'
-            fake_dst = type(self._drag_src)(
-                self._drag_src.owner_agent, self._drag_src.func_name,
-                self._drag_src.in_type, self._drag_src.out_type
-            )
-            fake_dst.layer_name = getattr(self._drag_src, "layer_name", None)
-            fake_dst.setPos(event.scenePos())
-            self._drag_temp.dst = fake_dst
-            self._drag_temp._rebuild_path()
+            # Coalesce wire updates to ~60 fps; high-rate devices deliver
+            # mouse moves far faster than the repaint is worth.
+            self._drag_last_pos = event.scenePos()
+            if not self._drag_tick.isActive():
+                self._drag_tick.start()
         super().mouseMoveEvent(event)
 
+    def _update_drag_wire(self):
+        if not (self._drag_temp and self._drag_src) or self._drag_last_pos is None:
+            return
+        # follow the latest mouse position; no throwaway node needed
+        self._drag_temp.dst = None
+        self._drag_temp.dst_point = self._drag_last_pos
+        self._drag_temp._rebuild_path()
+
     def mouseReleaseEvent(self, event):
         if self._drag_src and self._drag_temp:
             # resolve drop target
@@ -264,6 +366,8 @@ class CanvasScene(QGraphicsScene):
                     # (optional) visual feedback on type mismatch
                     pass
             # cleanup temp
+            self._drag_tick.stop()
+            self._drag_last_pos = None
             self.removeItem(self._drag_temp)
             self._drag_temp = None
             self._drag_src = None
@@ -279,6 +383,7 @@ class CanvasScene(QGraphicsScene):
 
     # ----- Edge maintenance ---------------------------------------------------
     def _on_func_moved(self, fn_item: FunctionNodeItem):
+        self._grid_update(fn_item)
         for edge in self._edges_by_func.get(fn_item, []):
             edge._rebuild_path()
         if (self.manual_mode or self._restoring_positions) and getattr(fn_item, "layer_name", None):
@@ -340,23 +445,53 @@ class CanvasScene(QGraphicsScene):
                 if getattr(fn_item, "layer_name", None) == layer_name:
                     fn_item.moveBy(0.0, delta_y)
 
+    # ----- Function-box spatial grid -----------------------------------------
+    def _grid_insert(self, item: FunctionNodeItem):
+        rect = item.sceneBoundingRect()
+        cells: List[Tuple[int, int]] = []
+        for cx in range(int(rect.left() // GRID_CELL), int(rect.right() // GRID_CELL) + 1):
+            for cy in range(int(rect.top() // GRID_CELL), int(rect.bottom() // GRID_CELL) + 1):
+                self._fn_grid.setdefault((cx, cy), []).append(item)
+                cells.append((cx, cy))
+        self._fn_grid_cells[item] = cells
+
+    def _grid_remove(self, item: FunctionNodeItem):
+        for cell in self._fn_grid_cells.pop(item, ()):
+            bucket = self._fn_grid.get(cell)
+            if bucket and item in bucket:
+                bucket.remove(item)
+                if not bucket:
+                    del self._fn_grid[cell]
+
+    def _grid_update(self, item: FunctionNodeItem):
+        self._grid_remove(item)
+        self._grid_insert(item)
+
     def _function_node_at(self, pos: QPointF) -> FunctionNodeItem | None:
-        if not self.views():
-            return None
-        item = self.itemAt(pos, self.views()[0].transform())
+        # Broad phase: only the boxes sharing this grid cell are candidates,
+        # which skips the scene walk on the vast majority of mouse events.
+        cell = (int(pos.x() // GRID_CELL), int(pos.y() // GRID_CELL))
+        for item in self._fn_grid.get(cell, ()):
+            if item.sceneBoundingRect().contains(pos):
+                return item
+        view = self._primary_view
+        if view is None or view.scene() is not self:
+            views = self.views()
+            if not views:
+                return None
+            view = self._primary_view = views[0]
+        item = self.itemAt(pos, view.transform())
         while item and not isinstance(item, FunctionNodeItem):
             item = item.parentItem()
         return item if isinstance(item, FunctionNodeItem) else None
 
     def _find_function_item(self, func_id: str, layer_name: str | None):
-        items = self._func_items.get(func_id, [])
-        if not items:
-            return None
         if layer_name:
-            for item in items:
-                if getattr(item, "layer_name", None) == layer_name:
-                    return item
-        return items[0]
+            item = self._func_item_by_layer.get((layer_name, func_id))
+            if item is not None:
+                return item
+        items = self._func_items.get(func_id)
+        return items[0] if items else None
 
     def _make_conn_key(self, spec: dict):
         return (
@@ -410,27 +545,27 @@ class CanvasScene(QGraphicsScene):
         if not spec:
             return False
         key = self._make_conn_key(spec)
-        if record and key in self._connection_keys:
+        if record and key in self._connections:
             return False
 
         conn = ConnectionItem(src_item, dst_item, spec.get("type", "MessageNone"))
         conn.spec = spec
         conn.key = key
         self.addItem(conn)
-        self._connections.append(conn)
+        self._connections[key] = conn
         self._edges_by_func.setdefault(src_item, []).append(conn)
         self._edges_by_func.setdefault(dst_item, []).append(conn)
-        self._connection_keys.add(key)
         if record:
-            self._connection_specs.append(spec)
+            self._connection_specs[key] = spec
         if emit_signal:
             signals.connection_added.emit(spec)
         self._connections_need_sync = False
         return True
 
     def _detach_connection_item(self, conn: ConnectionItem):
-        if conn in self._connections:
-            self._connections.remove(conn)
+        key = getattr(conn, "key", None)
+        if key is not None:
+            self._connections.pop(key, None)
         edges = self._edges_by_func.get(conn.src)
         if edges and conn in edges:
             edges.remove(conn)
@@ -449,21 +584,18 @@ class CanvasScene(QGraphicsScene):
         key = getattr(conn, "key", None)
         self._detach_connection_item(conn)
         if key is not None:
-            self._connection_keys.discard(key)
-        if spec and spec in self._connection_specs:
-            self._connection_specs.remove(spec)
+            self._connection_specs.pop(key, None)
         if emit_signal and spec:
             signals.connection_removed.emit(spec)
         self._connections_need_sync = False
 
     def _remove_all_manual_connections(self):
-        for conn in list(self._connections):
+        for conn in list(self._connections.values()):
             self._detach_connection_item(conn)
         self._connections.clear()
 
     def _restore_connections_from_specs(self, force: bool = False):
         if not self._connection_specs:
-            self._connection_keys = set()
             self._connections_need_sync = False
             return
         if not force and not self._connections_need_sync:
@@ -472,11 +604,10 @@ class CanvasScene(QGraphicsScene):
             self._connections_need_sync = True
             return
 
-        specs_snapshot = list(self._connection_specs)
+        specs_snapshot = list(self._connection_specs.items())
         self._remove_all_manual_connections()
-        self._connection_keys = set()
-        restored_specs = []
-        for spec in specs_snapshot:
+        restored_specs: Dict[tuple, dict] = {}
+        for key, spec in specs_snapshot:
             src_item = self._find_function_item(spec.get("src"), spec.get("src_layer"))
             dst_item = self._find_function_item(spec.get("dst"), spec.get("dst_layer"))
             if not src_item or not dst_item:
@@ -489,7 +620,7 @@ class CanvasScene(QGraphicsScene):
                 record=False,
                 emit_signal=False,
             ):
-                restored_specs.append(spec)
+                restored_specs[key] = spec
 
         self._connection_specs = restored_specs
         self._connections_need_sync = False
@@ -584,23 +715,20 @@ class CanvasScene(QGraphicsScene):
         }
 
     def get_connections(self) -> list[dict]:
-        return [dict(spec) for spec in self._connection_specs]
+        return [dict(spec) for spec in self._connection_specs.values()]
 
     def set_connections(self, specs: list[dict]):
-        normalized: List[dict] = []
-        keys = set()
+        normalized: Dict[tuple, dict] = {}
         for spec in specs or []:
             norm = self._normalize_spec(spec)
             if not norm:
                 continue
             key = self._make_conn_key(norm)
-            if key in keys:
+            if key in normalized:
                 continue
-            normalized.append(norm)
-            keys.add(key)
+            normalized[key] = norm
 
         self._connection_specs = normalized
-        self._connection_keys = set()
         self._connections_need_sync = True
         self._remove_all_manual_connections()
         self._restore_connections_from_specs(force=True)
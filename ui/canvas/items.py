@@ -228,6 +228,7 @@ class ConnectionItem(QGraphicsPathItem):
         super().__init__()
         self.src = src_item
         self.dst = dst_item
+        self.dst_point: Optional[QPointF] = None  # drag-follow point when dst is None
         self.message_type = message_type
         self.setZValue(-1)
         self.setPen(QPen(QColor("#8ad"), 2.0))
@@ -235,10 +236,17 @@ class ConnectionItem(QGraphicsPathItem):
         self._rebuild_path()
 
     def _rebuild_path(self):
-        src_center = self.src.scenePos()
-        dst_center = self.dst.scenePos()
-
-        if self.src is self.dst:
+        if self.dst is None:
+            # Drag in progress: follow a raw scene point instead of a node.
+            if self.dst_point is None:
+                return
+            p0 = self.src.port_pos_out()
+            p1 = self.dst_point
+            dy = max(40.0, abs(p1.y() - p0.y()) * 0.5)
+            mid_dx = (p1.x() - p0.x()) * 0.25
+            c0 = QPointF(p0.x() + mid_dx, p0.y() + dy)
+            c1 = QPointF(p1.x() - mid_dx, p1.y() - dy)
+        elif self.src is self.dst:
             p0 = self.src.port_pos_right()
             p1 = self.dst.port_pos_right()
             dx = max(60.0, abs(p1.x() - p0.x()) * 0.5)